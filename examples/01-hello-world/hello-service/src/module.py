@@ -3,13 +3,7 @@ Hello World Service - Module Implementation
 Demonstrates the minimal ModuleInterface implementation
 """
 
-import sys
-import os
-from pathlib import Path
-
-# Add the SDK to Python path (monorepo structure)
-sdk_path = Path(__file__).parent.parent.parent.parent.parent / "packages" / "sdk-python"
-sys.path.insert(0, str(sdk_path))
+from datetime import datetime
 
 from modularity_sdk import ModuleInterface
 
@@ -28,6 +22,7 @@ class HelloModule(ModuleInterface):
         self.config = config
         self.greeting = config.get('default_greeting', 'Hello')
         self.name = config.get('default_name', 'World')
+        self._default_message = f"{self.greeting}, {self.name}!"
 
         print(f"HelloModule initialized with greeting: '{self.greeting}'")
         return True
@@ -36,7 +31,7 @@ class HelloModule(ModuleInterface):
         """
         Return the list of capabilities this module provides.
         """
-        return ['greet']
+        return list(self._CAPABILITIES)
 
     def invoke(self, capability, params):
         """
@@ -49,19 +44,35 @@ class HelloModule(ModuleInterface):
         Returns:
             Dictionary with the result
         """
-        if capability == 'greet':
-            # Get name from params, or use default
-            name = params.get('name', self.name)
-            greeting = params.get('greeting', self.greeting)
+        handler = self._HANDLERS.get(capability)
+        if handler is None:
+            # Unknown capability
+            raise ValueError(f"Unknown capability: {capability}")
+
+        return handler(self, params)
 
-            # Return the greeting message
+    def _greet(self, params):
+        """The 'greet' capability"""
+        # No params: the message is always the precomputed default
+        if not params:
             return {
-                'message': f"{greeting}, {name}!",
+                'message': self._default_message,
                 'timestamp': self._get_timestamp()
             }
 
-        # Unknown capability
-        raise ValueError(f"Unknown capability: {capability}")
+        # Get name from params, or use default
+        name = params.get('name', self.name)
+        greeting = params.get('greeting', self.greeting)
+
+        # Return the greeting message
+        return {
+            'message': f"{greeting}, {name}!",
+            'timestamp': self._get_timestamp()
+        }
+
+    # Capability name -> handler; add an entry here to expose a new capability
+    _HANDLERS = {'greet': _greet}
+    _CAPABILITIES = tuple(_HANDLERS)
 
     def handle_event(self, event, data):
         """
@@ -78,5 +89,4 @@ class HelloModule(ModuleInterface):
 
     def _get_timestamp(self):
         """Helper method to get current timestamp"""
-        from datetime import datetime
         return datetime.now().isoformat()
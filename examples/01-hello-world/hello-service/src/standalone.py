@@ -3,14 +3,9 @@ Hello World Service - Standalone Mode
 Runs the service as an independent HTTP server
 """
 
-import sys
 import os
 from pathlib import Path
 
-# Add the SDK to Python path (monorepo structure)
-sdk_path = Path(__file__).parent.parent.parent.parent.parent / "packages" / "sdk-python"
-sys.path.insert(0, str(sdk_path))
-
 from modularity_sdk import ModularitySDK
 
 
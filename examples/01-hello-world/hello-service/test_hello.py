@@ -2,13 +2,8 @@
 Simple test for Hello Service
 """
 
-import sys
 from pathlib import Path
 
-# Add the SDK to Python path (monorepo structure)
-sdk_path = Path(__file__).parent.parent.parent.parent / "packages" / "sdk-python"
-sys.path.insert(0, str(sdk_path))
-
 from modularity_sdk import ModularitySDK
 
 
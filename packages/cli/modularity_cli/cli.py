@@ -5,44 +5,118 @@ Command-line interface for managing the modular application ecosystem
 """
 
 import click
-import requests
-import json
+import functools
+import msgspec
 from pathlib import Path
-from typing import Dict, Any, Optional
-import subprocess
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+import os
 import sys
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.syntax import Syntax
-from rich import box
-import yaml
 
-console = Console()
+# requests, rich and yaml are imported where they are used so that
+# `modularity --help` and file-only commands skip their import cost.
+if TYPE_CHECKING:
+    import requests
+    from rich.console import Console
 
 DEFAULT_REGISTRY = "http://localhost:5000"
 CONFIG_FILE = Path.home() / ".modularity" / "cli-config.json"
 
+# File extension for each supported runtime ('txt' for anything else)
+_EXTENSIONS = {
+    'python': 'py',
+    'javascript': 'js',
+    'go': 'go',
+    'ruby': 'rb'
+}
+
+# Body of the `status` panel, filled straight from the /api/stats response
+_STATUS_TEMPLATE = """
+    [cyan]Total Services:[/cyan] {total_services}
+    [green]Active:[/green] {active_services}
+    [yellow]Inactive:[/yellow] {inactive_services}
+    [blue]Capabilities:[/blue] {total_capabilities}
+    """.format_map
+
+# Parsed config files keyed by path, stored with the mtime they were read at
+_CONFIG_CACHE: Dict[Path, Tuple[int, Dict[str, Any]]] = {}
+
+
+class Provides(msgspec.Struct):
+    """The `provides` section of an application manifest"""
+    capabilities: List[str] = []
+
+
+class Manifest(msgspec.Struct):
+    """Fields an application manifest must define (unknown fields are ignored)"""
+    id: str
+    name: str
+    version: str
+    runtime: str
+    provides: Provides
+    interfaces: Dict[str, Any]
+
+
+class LaunchInfo(msgspec.Struct):
+    """The only manifest fields `run` needs; the rest is skipped while decoding"""
+    name: str
+    runtime: str
+
+
+@functools.cache
+def _console() -> "Console":
+    """Return the shared rich console (created on first use)"""
+    from rich.console import Console
+    return Console()
+
 
 class ModularityCLI:
     """CLI helper class"""
 
     def __init__(self, registry_url: str = DEFAULT_REGISTRY):
         self.registry_url = registry_url
+        self._session = None
         self._load_config()
 
+    @property
+    def session(self) -> "requests.Session":
+        """Pooled HTTP session so repeated API calls reuse connections"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> "requests.Session":
+        """Create a pooled HTTP session"""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.headers.update({'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def _load_config(self):
-        """Load CLI configuration"""
-        if CONFIG_FILE.exists():
-            with open(CONFIG_FILE) as f:
-                config = json.load(f)
-                self.registry_url = config.get('registry_url', DEFAULT_REGISTRY)
+        """Load CLI configuration (re-parsed only when the file changes)"""
+        try:
+            mtime = CONFIG_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        cached = _CONFIG_CACHE.get(CONFIG_FILE)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, msgspec.json.decode(CONFIG_FILE.read_bytes()))
+            _CONFIG_CACHE[CONFIG_FILE] = cached
+
+        self.registry_url = cached[1].get('registry_url', DEFAULT_REGISTRY)
 
     def _save_config(self):
         """Save CLI configuration"""
+        config = {'registry_url': self.registry_url}
         CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump({'registry_url': self.registry_url}, f)
+        CONFIG_FILE.write_bytes(msgspec.json.encode(config))
+        # Write through so a reload within the same mtime tick sees the new value
+        _CONFIG_CACHE[CONFIG_FILE] = (CONFIG_FILE.stat().st_mtime_ns, config)
 
     def set_registry(self, url: str):
         """Set the registry URL"""
@@ -51,40 +125,71 @@ class ModularityCLI:
 
     def api_get(self, endpoint: str):
         """Make GET request to registry API"""
+        import requests
         try:
-            response = requests.get(f"{self.registry_url}{endpoint}", timeout=10)
+            response = self.session.get(f"{self.registry_url}{endpoint}", timeout=10)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            console.print(f"[red]Error: {e}[/red]")
+            return msgspec.json.decode(response.content)
+        except (requests.RequestException, msgspec.DecodeError) as e:
+            _console().print(f"[red]Error: {e}[/red]")
             sys.exit(1)
 
+    def api_get_many(self, endpoints: List[str]) -> List[Any]:
+        """
+        Make concurrent GET requests to registry API over the shared session.
+        Returns one result per endpoint, in order: None where the registry has
+        nothing to offer (404/503), the exception for any other failure.
+        """
+        import requests
+        from concurrent.futures import ThreadPoolExecutor
+
+        def fetch(endpoint: str) -> Any:
+            try:
+                response = self.session.get(f"{self.registry_url}{endpoint}", timeout=10)
+                if response.status_code in (404, 503):
+                    return None
+                response.raise_for_status()
+                return msgspec.json.decode(response.content)
+            except (requests.RequestException, msgspec.DecodeError) as e:
+                return e
+
+        if len(endpoints) == 1:
+            return [fetch(endpoints[0])]
+
+        with ThreadPoolExecutor(max_workers=min(len(endpoints), 10)) as executor:
+            return [*executor.map(fetch, endpoints)]
+
     def api_post(self, endpoint: str, data: Dict):
         """Make POST request to registry API"""
+        import requests
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.registry_url}{endpoint}",
                 json=data,
                 timeout=10
             )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            console.print(f"[red]Error: {e}[/red]")
+            return msgspec.json.decode(response.content)
+        except (requests.RequestException, msgspec.DecodeError) as e:
+            _console().print(f"[red]Error: {e}[/red]")
             sys.exit(1)
 
     def api_delete(self, endpoint: str):
         """Make DELETE request to registry API"""
+        import requests
         try:
-            response = requests.delete(f"{self.registry_url}{endpoint}", timeout=10)
+            response = self.session.delete(f"{self.registry_url}{endpoint}", timeout=10)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            console.print(f"[red]Error: {e}[/red]")
+            return msgspec.json.decode(response.content)
+        except (requests.RequestException, msgspec.DecodeError) as e:
+            _console().print(f"[red]Error: {e}[/red]")
             sys.exit(1)
 
 
-cli_helper = ModularityCLI()
+@functools.cache
+def _get_helper() -> ModularityCLI:
+    """Return the shared CLI helper (config is loaded on first use)"""
+    return ModularityCLI()
 
 
 @click.group()
@@ -92,23 +197,19 @@ cli_helper = ModularityCLI()
 def cli(registry):
     """Modularity CLI - Manage your modular application ecosystem"""
     if registry != DEFAULT_REGISTRY:
-        cli_helper.set_registry(registry)
+        _get_helper().set_registry(registry)
 
 
 @cli.command()
 def status():
     """Show modularity status and statistics"""
-    stats = cli_helper.api_get("/api/stats")
+    from rich.panel import Panel
 
-    # Create status panel
-    status_text = f"""
-    [cyan]Total Services:[/cyan] {stats['total_services']}
-    [green]Active:[/green] {stats['active_services']}
-    [yellow]Inactive:[/yellow] {stats['inactive_services']}
-    [blue]Capabilities:[/blue] {stats['total_capabilities']}
-    """
+    console = _console()
+    stats = _get_helper().api_get("/api/stats")
 
-    console.print(Panel(status_text, title="Modularity Status", border_style="green"))
+    # Create status panel
+    console.print(Panel(_STATUS_TEMPLATE(stats), title="Modularity Status", border_style="green"))
 
     # Show services by runtime
     if stats['services_by_runtime']:
@@ -126,18 +227,22 @@ def list(status, format):
     if status:
         endpoint += f"?status={status}"
 
-    data = cli_helper.api_get(endpoint)
+    data = _get_helper().api_get(endpoint)
     services = data['services']
 
     if format == 'json':
-        console.print_json(data=services)
+        _print_json(services)
         return
 
     if format == 'yaml':
-        console.print(yaml.dump(services, default_flow_style=False))
+        _print_yaml(services)
         return
 
     # Table format
+    from rich import box
+    from rich.table import Table
+
+    console = _console()
     table = Table(title=f"Registered Services ({data['count']})", box=box.ROUNDED)
     table.add_column("ID", style="cyan")
     table.add_column("Name", style="green")
@@ -146,20 +251,23 @@ def list(status, format):
     table.add_column("Capabilities", style="blue")
     table.add_column("Location", style="dim")
 
-    for service in services:
-        status_color = "green" if service['status'] == 'active' else "red"
-        caps = ", ".join(service['capabilities'][:3])
-        if len(service['capabilities']) > 3:
-            caps += f" (+{len(service['capabilities']) - 3} more)"
-
-        table.add_row(
+    # Format every row first, then hand them to the table in one tight loop
+    rows = [
+        (
             service['id'],
             service['name'],
             service['version'],
-            f"[{status_color}]{service['status']}[/{status_color}]",
-            caps,
+            f"[green]{service['status']}[/green]" if service['status'] == 'active'
+            else f"[red]{service['status']}[/red]",
+            _truncate_list(service['capabilities']),
             service['location']
         )
+        for service in services
+    ]
+
+    add_row = table.add_row
+    for row in rows:
+        add_row(*row)
 
     console.print(table)
 
@@ -169,17 +277,20 @@ def list(status, format):
 @click.option('--format', type=click.Choice(['table', 'json', 'yaml']), default='table')
 def info(service_id, format):
     """Show detailed information about a service"""
-    service = cli_helper.api_get(f"/api/services/{service_id}")
+    service = _get_helper().api_get(f"/api/services/{service_id}")
 
     if format == 'json':
-        console.print_json(data=service)
+        _print_json(service)
         return
 
     if format == 'yaml':
-        console.print(yaml.dump(service, default_flow_style=False))
+        _print_yaml(service)
         return
 
     # Pretty format
+    from rich.panel import Panel
+
+    console = _console()
     console.print(Panel(f"[bold cyan]{service['name']}[/bold cyan]",
                        subtitle=f"ID: {service['id']}",
                        border_style="cyan"))
@@ -203,13 +314,17 @@ def info(service_id, format):
 @click.option('--format', type=click.Choice(['table', 'json']), default='table')
 def capabilities(format):
     """List all available capabilities"""
-    data = cli_helper.api_get("/api/capabilities")
+    data = _get_helper().api_get("/api/capabilities")
     caps = data['capabilities']
 
     if format == 'json':
-        console.print_json(data=caps)
+        _print_json(caps)
         return
 
+    from rich import box
+    from rich.table import Table
+
+    console = _console()
     table = Table(title=f"Available Capabilities ({data['count']})", box=box.ROUNDED)
     table.add_column("Capability", style="cyan")
     table.add_column("Providers", style="green")
@@ -230,27 +345,43 @@ def capabilities(format):
 
 
 @cli.command()
-@click.argument('capability_name')
-def find(capability_name):
-    """Find services providing a specific capability"""
-    try:
-        service = cli_helper.api_get(f"/api/capabilities/{capability_name}")
+@click.argument('capability_names', nargs=-1, required=True)
+def find(capability_names):
+    """Find services providing one or more capabilities"""
+    console = _console()
+    services = _get_helper().api_get_many(
+        [f"/api/capabilities/{name}" for name in capability_names]
+    )
+
+    missing = False
+    for capability_name, service in zip(capability_names, services):
+        if service is None:
+            console.print(f"[red]✗[/red] No active services provide capability: {capability_name}")
+            missing = True
+            continue
+        if isinstance(service, Exception):
+            console.print(f"[red]Error: {service}[/red]")
+            missing = True
+            continue
+
         console.print(f"\n[green]✓[/green] Found service: [bold]{service['name']}[/bold]")
         console.print(f"  ID: {service['id']}")
         console.print(f"  Location: {service['location']}")
         console.print(f"  Status: {service['status']}")
-    except SystemExit:
-        console.print(f"[red]✗[/red] No active services provide capability: {capability_name}")
+
+    if missing:
+        sys.exit(1)
 
 
 @cli.command()
 @click.argument('service_id')
 def unregister(service_id):
     """Unregister a service from the modularity system"""
+    console = _console()
     if not click.confirm(f"Are you sure you want to unregister '{service_id}'?"):
         return
 
-    result = cli_helper.api_delete(f"/api/unregister/{service_id}")
+    result = _get_helper().api_delete(f"/api/unregister/{service_id}")
     console.print(f"[green]✓[/green] {result['message']}")
 
 
@@ -262,16 +393,14 @@ def unregister(service_id):
 @click.option('--path', default='.', help='Directory to create the app')
 def init(app_id, app_name, runtime, path):
     """Initialize a new modularity-compatible application"""
+    console = _console()
     app_path = Path(path) / app_id
 
     if app_path.exists():
         console.print(f"[red]Error: Directory {app_path} already exists[/red]")
         sys.exit(1)
 
-    # Create directory structure
-    app_path.mkdir(parents=True)
-    (app_path / "src").mkdir()
-    (app_path / "adapters").mkdir()
+    extension = _EXTENSIONS.get(runtime, 'txt')
 
     # Create manifest
     manifest = {
@@ -301,7 +430,7 @@ def init(app_id, app_name, runtime, path):
                 "basePath": "/api"
             },
             "module": {
-                "entry": f"src/module.{_get_extension(runtime)}",
+                "entry": f"src/module.{extension}",
                 "class": "AppModule"
             }
         },
@@ -310,22 +439,26 @@ def init(app_id, app_name, runtime, path):
         }
     }
 
-    with open(app_path / "app.manifest.json", 'w') as f:
-        json.dump(manifest, f, indent=2)
+    # Render every file up front, then create the tree and write them in one pass
+    files = [
+        ("app.manifest.json", _encode_pretty(manifest)),
+        ("config.defaults.json", _encode_pretty({})),
+        *_template_files(runtime),
+    ]
 
-    # Create default config
-    with open(app_path / "config.defaults.json", 'w') as f:
-        json.dump({}, f, indent=2)
+    app_path.mkdir(parents=True)
+    (app_path / "src").mkdir()
+    (app_path / "adapters").mkdir()
 
-    # Create template files based on runtime
-    _create_template_files(app_path, runtime)
+    for relative_path, content in files:
+        (app_path / relative_path).write_bytes(content)
 
     console.print(f"\n[green]✓[/green] Created new {runtime} application: [bold]{app_name}[/bold]")
     console.print(f"  Location: {app_path}")
     console.print("\nNext steps:")
     console.print(f"  1. cd {app_path}")
     console.print("  2. Edit app.manifest.json to define capabilities")
-    console.print(f"  3. Implement your module in src/module.{_get_extension(runtime)}")
+    console.print(f"  3. Implement your module in src/module.{extension}")
     console.print("  4. Run with: modularity run")
 
 
@@ -335,18 +468,25 @@ def init(app_id, app_name, runtime, path):
 @click.option('--port', type=int, help='Port to bind to (overrides manifest)')
 def run(manifest, host, port):
     """Run an application in standalone mode"""
+    console = _console()
     manifest_path = Path(manifest)
 
-    if not manifest_path.exists():
+    try:
+        data = manifest_path.read_bytes()
+    except FileNotFoundError:
         console.print(f"[red]Error: Manifest not found: {manifest}[/red]")
         sys.exit(1)
 
-    with open(manifest_path) as f:
-        manifest_data = json.load(f)
+    try:
+        launch = msgspec.json.decode(data, type=LaunchInfo)
+    except msgspec.DecodeError as e:
+        from rich.markup import escape
+        console.print(f"[red]Error: Invalid manifest: {escape(str(e))}[/red]")
+        sys.exit(1)
 
-    runtime = manifest_data['runtime']
+    runtime = launch.runtime
 
-    console.print(f"[cyan]Starting {manifest_data['name']}...[/cyan]")
+    console.print(f"[cyan]Starting {launch.name}...[/cyan]")
 
     # Run based on runtime
     if runtime == 'python':
@@ -362,50 +502,67 @@ def run(manifest, host, port):
 @click.argument('manifest_path')
 def validate(manifest_path):
     """Validate an application manifest"""
+    console = _console()
     path = Path(manifest_path)
 
-    if not path.exists():
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
         console.print(f"[red]✗ Manifest not found: {manifest_path}[/red]")
         sys.exit(1)
 
     try:
-        with open(path) as f:
-            manifest = json.load(f)
+        manifest = msgspec.json.decode(data, type=Manifest)
+    except msgspec.ValidationError as e:
+        from rich.markup import escape
+        console.print(f"[red]✗ Invalid manifest: {escape(str(e))}[/red]")
+        sys.exit(1)
+    except msgspec.DecodeError as e:
+        console.print(f"[red]✗ Invalid JSON: {e}[/red]")
+        sys.exit(1)
 
-        # Check required fields
-        required = ['id', 'name', 'version', 'runtime', 'provides', 'interfaces']
-        missing = [field for field in required if field not in manifest]
+    console.print("[green]✓ Manifest is valid[/green]")
 
-        if missing:
-            console.print(f"[red]✗ Missing required fields: {', '.join(missing)}[/red]")
-            sys.exit(1)
+    # Show summary
+    console.print(f"\n[bold]Application:[/bold] {manifest.name}")
+    console.print(f"[bold]ID:[/bold] {manifest.id}")
+    console.print(f"[bold]Runtime:[/bold] {manifest.runtime}")
+    console.print(f"[bold]Capabilities:[/bold] {len(manifest.provides.capabilities)}")
 
-        console.print("[green]✓ Manifest is valid[/green]")
 
-        # Show summary
-        console.print(f"\n[bold]Application:[/bold] {manifest['name']}")
-        console.print(f"[bold]ID:[/bold] {manifest['id']}")
-        console.print(f"[bold]Runtime:[/bold] {manifest['runtime']}")
-        console.print(f"[bold]Capabilities:[/bold] {len(manifest['provides']['capabilities'])}")
+def _encode_pretty(data: Any) -> bytes:
+    """Encode data as indented JSON for files meant to be edited by hand"""
+    return msgspec.json.format(msgspec.json.encode(data), indent=2)
 
-    except json.JSONDecodeError as e:
-        console.print(f"[red]✗ Invalid JSON: {e}[/red]")
-        sys.exit(1)
 
+def _truncate_list(items: List[str], limit: int = 3) -> str:
+    """Join the first few items, noting how many more were left out"""
+    text = ", ".join(items[:limit])
+    if len(items) > limit:
+        text += f" (+{len(items) - limit} more)"
+    return text
 
-def _get_extension(runtime: str) -> str:
-    """Get file extension for runtime"""
-    extensions = {
-        'python': 'py',
-        'javascript': 'js',
-        'go': 'go',
-        'ruby': 'rb'
-    }
-    return extensions.get(runtime, 'txt')
+
+def _print_json(data: Any):
+    """Write machine-readable JSON straight to stdout, bypassing rich"""
+    click.echo(_encode_pretty(data).decode())
+
+
+def _print_yaml(data: Any):
+    """Write machine-readable YAML straight to stdout, bypassing rich"""
+    import yaml
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)  # C dumper when libyaml is available
+    click.echo(yaml.dump(data, Dumper=dumper, default_flow_style=False), nl=False)
 
 
 def _create_template_files(app_path: Path, runtime: str):
     """Create template implementation files"""
+    for relative_path, content in _template_files(runtime):
+        (app_path / relative_path).write_bytes(content)
+
+
+def _template_files(runtime: str) -> List[Tuple[str, bytes]]:
+    """Return (path relative to the app, content) for a runtime's template files"""
     if runtime == 'python':
         module_code = '''"""Application module implementation"""
 
@@ -447,8 +604,10 @@ if __name__ == "__main__":
     sdk.run_standalone()
 '''
 
-        (app_path / "src" / "module.py").write_text(module_code)
-        (app_path / "src" / "standalone.py").write_text(standalone_code)
+        return [
+            ("src/module.py", module_code.encode()),
+            ("src/standalone.py", standalone_code.encode()),
+        ]
 
     elif runtime == 'javascript':
         module_code = '''/**
@@ -499,12 +658,17 @@ async function main() {
 main().catch(console.error);
 '''
 
-        (app_path / "src" / "module.js").write_text(module_code)
-        (app_path / "src" / "standalone.js").write_text(standalone_code)
+        return [
+            ("src/module.js", module_code.encode()),
+            ("src/standalone.js", standalone_code.encode()),
+        ]
+
+    return []
 
 
 def _run_python_app(manifest_path: Path, host: str, port: Optional[int]):
     """Run a Python application"""
+    console = _console()
     app_dir = manifest_path.parent
     standalone_script = app_dir / "src" / "standalone.py"
 
@@ -512,19 +676,12 @@ def _run_python_app(manifest_path: Path, host: str, port: Optional[int]):
         console.print(f"[red]Error: Standalone script not found: {standalone_script}[/red]")
         sys.exit(1)
 
-    # Pass host and port via environment variables
-    import os
-    env = os.environ.copy()
-    env['MODULE_HOST'] = host
-    if port:
-        env['MODULE_PORT'] = str(port)
-
-    cmd = [sys.executable, str(standalone_script)]
-    subprocess.run(cmd, cwd=app_dir, env=env, check=True)
+    _exec_app([sys.executable, str(standalone_script.resolve())], app_dir, host, port)
 
 
 def _run_javascript_app(manifest_path: Path, host: str, port: Optional[int]):
     """Run a JavaScript application"""
+    console = _console()
     app_dir = manifest_path.parent
     standalone_script = app_dir / "src" / "standalone.js"
 
@@ -532,15 +689,34 @@ def _run_javascript_app(manifest_path: Path, host: str, port: Optional[int]):
         console.print(f"[red]Error: Standalone script not found: {standalone_script}[/red]")
         sys.exit(1)
 
+    _exec_app(['node', str(standalone_script.resolve())], app_dir, host, port)
+
+
+def _exec_app(cmd: List[str], app_dir: Path, host: str, port: Optional[int]):
+    """
+    Replace the CLI process with the application, run from its directory.
+    Exec'ing avoids keeping a second interpreter resident for the app's lifetime.
+    """
     # Pass host and port via environment variables
-    import os
     env = os.environ.copy()
     env['MODULE_HOST'] = host
     if port:
         env['MODULE_PORT'] = str(port)
 
-    cmd = ['node', str(standalone_script)]
-    subprocess.run(cmd, cwd=app_dir, env=env, check=True)
+    # Anything still buffered would be lost when the process image is replaced
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    # exec keeps the current directory, so it has to be changed here first
+    cwd = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        os.execvpe(cmd[0], cmd, env)
+    except OSError as e:
+        # Only reached when the runtime can't be started, e.g. `node` not on PATH
+        os.chdir(cwd)
+        _console().print(f"[red]Error: Could not start {cmd[0]}: {e}[/red]")
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -3,163 +3,361 @@ Tests for the Modularity CLI
 """
 
 import pytest
+import contextlib
+import io
 import json
-import tempfile
-from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
+import msgspec
+import requests
+from types import SimpleNamespace
+from unittest.mock import patch, create_autospec
 from click.testing import CliRunner
 import sys
 import os
 
-# Add parent directory to path to import modularity_cli
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+import modularity_cli.cli as cli_module
 from modularity_cli.cli import (
     cli,
+    _get_helper,
     ModularityCLI,
-    _get_extension,
-    _create_template_files
+    _create_template_files,
+    status as status_cmd,
+    list as list_cmd,
+    info as info_cmd,
+    capabilities as capabilities_cmd,
+    find as find_cmd
 )
 
 
-@pytest.fixture
+def _encode(payload):
+    """Encode a payload the way the registry sends it"""
+    return json.dumps(payload).encode()
+
+
+class _FakeResp:
+    """Just enough of requests.Response for the CLI: content and raise_for_status()"""
+    __slots__ = ('content', 'status_code')
+
+    def __init__(self, payload, status_code=200):
+        self.content = _encode(payload)
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        # A fresh exception per raise, so shared responses never carry a stale traceback
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+
+def _response(payload, status_code=200):
+    """Build a canned registry response; the payload is encoded once, here"""
+    return _FakeResp(payload, status_code)
+
+
+_STATUS_RESPONSE = _response({
+    'total_services': 5,
+    'active_services': 4,
+    'inactive_services': 1,
+    'total_capabilities': 10,
+    'services_by_runtime': {
+        'python': 3,
+        'javascript': 2
+    }
+})
+
+_LIST_RESPONSE = _response({
+    'services': [
+        {
+            'id': 'service1',
+            'name': 'Service 1',
+            'version': '1.0.0',
+            'status': 'active',
+            'capabilities': ['cap1', 'cap2', 'cap3', 'cap4', 'cap5'],
+            'location': 'http://localhost:3001'
+        },
+        {
+            'id': 'service2',
+            'name': 'Service 2',
+            'version': '1.0.0',
+            'status': 'inactive',
+            'capabilities': ['cap3'],
+            'location': 'http://localhost:3002'
+        }
+    ],
+    'count': 2
+})
+
+_INFO_RESPONSE = _response({
+    'id': 'test-service',
+    'name': 'Test Service',
+    'version': '1.0.0',
+    'status': 'active',
+    'mode': 'http',
+    'location': 'http://localhost:3000',
+    'capabilities': ['cap1', 'cap2'],
+    'registered_at': '2024-01-01T00:00:00',
+    'last_seen': '2024-01-01T01:00:00'
+})
+
+_CAPS_RESPONSE = _response({
+    'capabilities': [
+        {
+            'capability': 'cap1',
+            'providers': ['service1', 'service2'],
+            'count': 2
+        },
+        {
+            'capability': 'cap2',
+            'providers': ['service3'],
+            'count': 1
+        }
+    ],
+    'count': 2
+})
+
+_FIND_RESPONSE = _response({
+    'id': 'service1',
+    'name': 'Service 1',
+    'location': 'http://localhost:3000',
+    'status': 'active'
+})
+
+_UNREGISTER_RESPONSE = _response({
+    'message': 'Service unregistered successfully'
+})
+
+_NOT_FOUND_RESPONSE = _response({'error': 'No active service provides this capability'}, 404)
+
+# A proxy error page in front of the registry: 200 OK, but not JSON
+_HTML_RESPONSE = _response(None)
+_HTML_RESPONSE.content = b'<html><body>Bad Gateway</body></html>'
+
+
+_VALID_MANIFEST = {
+    'id': 'test-app',
+    'name': 'Test App',
+    'version': '1.0.0',
+    'runtime': 'python',
+    'provides': {'capabilities': []},
+    'interfaces': {'http': {'port': 3000}}
+}
+
+# Only id and name: missing version, runtime and the rest
+_INCOMPLETE_MANIFEST = {
+    'id': 'test-app',
+    'name': 'Test App'
+}
+
+# provides.capabilities must be a list
+_MISTYPED_MANIFEST = {**_VALID_MANIFEST, 'provides': {'capabilities': 'greet'}}
+
+
+def _write_manifest(path, manifest):
+    """Write a manifest dict to disk in one call"""
+    path.write_text(json.dumps(manifest, separators=(',', ':')))
+
+
+def _invoke(command, **params):
+    """Run a command's callback in-process, skipping click's argv parsing
+
+    Use runner.invoke() instead when the test is about option parsing.
+    """
+    output = io.StringIO()
+    exit_code = 0
+    with contextlib.redirect_stdout(output):
+        try:
+            command.callback(**params)
+        except SystemExit as e:
+            exit_code = e.code
+    return SimpleNamespace(exit_code=exit_code, output=output.getvalue())
+
+
+@pytest.fixture(scope="session")
 def runner():
-    """Create a CLI runner for testing"""
+    """Create a CLI runner for testing (CliRunner keeps no per-test state)"""
     return CliRunner()
 
 
+# (runtime, extension) pairs the CLI can scaffold
+_RUNTIMES = [("python", "py"), ("javascript", "js")]
+
+
+@pytest.fixture(scope="session", params=_RUNTIMES, ids=[r for r, _ in _RUNTIMES])
+def initialized_app(request, runner, tmp_path_factory):
+    """Run `modularity init` once per runtime; tests only inspect the result"""
+    runtime, ext = request.param
+    path = tmp_path_factory.mktemp(f"init_{ext}")
+    result = runner.invoke(cli, [
+        'init',
+        'test-app',
+        'Test App',
+        '--runtime', runtime,
+        '--path', str(path)
+    ])
+    return runtime, ext, result, path / 'test-app'
+
+
+@pytest.fixture(scope="session", params=_RUNTIMES, ids=[r for r, _ in _RUNTIMES])
+def template_dir(request, tmp_path_factory):
+    """Render each runtime's templates once for the tests that read them"""
+    runtime, ext = request.param
+    app_path = tmp_path_factory.mktemp(f"tpl_{ext}")
+    (app_path / "src").mkdir()
+    _create_template_files(app_path, runtime)
+    return ext, app_path
+
+
+@pytest.fixture(scope="session")
+def valid_manifest_path(tmp_path_factory):
+    """A valid Python app on disk (manifest plus standalone script), shared read-only"""
+    app_dir = tmp_path_factory.mktemp("manifest")
+    manifest_path = app_dir / 'app.manifest.json'
+    _write_manifest(manifest_path, _VALID_MANIFEST)
+    (app_dir / 'src').mkdir()
+    (app_dir / 'src' / 'standalone.py').write_text('print("Running")')
+    return manifest_path
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """Point the CLI at a throwaway config file"""
+    original = cli_module.CONFIG_FILE
+    cli_module.CONFIG_FILE = tmp_path / "cli-config.json"
+    try:
+        yield cli_module.CONFIG_FILE
+    finally:
+        cli_module.CONFIG_FILE = original
+
+
+@pytest.fixture
+def helper_registry():
+    """Restore the shared helper's registry URL after a test changes it"""
+    helper = _get_helper()
+    original = helper.registry_url
+    try:
+        yield helper
+    finally:
+        helper.registry_url = original
+
+
+@pytest.fixture
+def exec_calls():
+    """Record the os.chdir/os.execvpe calls `run` makes instead of replacing the process"""
+    calls = {'chdir': [], 'execvpe': []}
+    saved = os.chdir, os.execvpe
+    os.chdir = lambda path: calls['chdir'].append(path)
+    os.execvpe = lambda file, args, env: calls['execvpe'].append((file, args, env))
+    try:
+        yield calls
+    finally:
+        os.chdir, os.execvpe = saved
+
+
+@pytest.fixture(scope="module")
+def _patched_session():
+    """Replace the helper's HTTP session once for the whole module
+
+    The mock is autospecced from requests.Session so a misspelled call fails
+    loudly; building the spec is the expensive part, so it is done only once.
+    """
+    mock_session = create_autospec(requests.Session, instance=True)
+    with patch.object(_get_helper(), '_session', mock_session):
+        yield mock_session
+
+
 @pytest.fixture
-def mock_api():
-    """Mock API responses"""
-    with patch('modularity_cli.cli.requests') as mock_requests:
-        yield mock_requests
+def mock_api(_patched_session):
+    """Mock API responses, reset before each test"""
+    _patched_session.reset_mock(return_value=True, side_effect=True)
+    return _patched_session
 
 
+@pytest.mark.xdist_group("cli-config")
 class TestModularityCLI:
     """Test ModularityCLI helper class"""
 
-    def test_cli_initialization(self):
+    def test_cli_initialization(self, config_file):
         """Test CLI helper initialization"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_file = Path(tmpdir) / "cli-config.json"
-            with patch('modularity_cli.cli.CONFIG_FILE', config_file):
-                cli_helper = ModularityCLI()
-                assert cli_helper.registry_url == "http://localhost:5000"
+        cli_helper = ModularityCLI()
+        assert cli_helper.registry_url == "http://localhost:5000"
+
+    def test_save_config(self, config_file):
+        """Test saving configuration writes it to disk"""
+        cli_helper = ModularityCLI()
+        cli_helper.set_registry("http://custom:5000")
+
+        assert cli_helper.registry_url == "http://custom:5000"
+        # Loading is covered by test_config_parsed_once_until_modified
+        assert json.loads(config_file.read_text())["registry_url"] == "http://custom:5000"
+
+    def test_config_parsed_once_until_modified(self, config_file):
+        """Test the config file is only re-parsed when its mtime changes"""
+        config_file.write_text(json.dumps({'registry_url': 'http://first:5000'}))
+        with patch('modularity_cli.cli.msgspec.json.decode',
+                   wraps=msgspec.json.decode) as mock_decode:
+            ModularityCLI()
+            ModularityCLI()
+            assert mock_decode.call_count == 1
+
+        config_file.write_text(json.dumps({'registry_url': 'http://second:5000'}))
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert ModularityCLI().registry_url == "http://second:5000"
 
-    def test_save_and_load_config(self):
-        """Test saving and loading configuration"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_file = Path(tmpdir) / "cli-config.json"
-            with patch('modularity_cli.cli.CONFIG_FILE', config_file):
-                cli_helper = ModularityCLI()
-                cli_helper.set_registry("http://custom:5000")
+    def test_session_is_reused(self, mock_api):
+        """Test API calls go through the shared session"""
+        mock_api.get.return_value = _LIST_RESPONSE
 
-                # Create new instance to test loading
-                cli_helper2 = ModularityCLI()
-                assert cli_helper2.registry_url == "http://custom:5000"
+        _get_helper().api_get("/api/services")
+        _get_helper().api_get("/api/services")
+
+        assert mock_api.get.call_count == 2
+        assert ModularityCLI().session.headers['Accept'] == 'application/json'
 
 
 class TestStatusCommand:
     """Test the status command"""
 
-    def test_status_command(self, runner, mock_api):
+    def test_status_command(self, mock_api):
         """Test status command displays statistics"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'total_services': 5,
-            'active_services': 4,
-            'inactive_services': 1,
-            'total_capabilities': 10,
-            'services_by_runtime': {
-                'python': 3,
-                'javascript': 2
-            }
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _STATUS_RESPONSE
 
-        result = runner.invoke(cli, ['status'])
+        result = _invoke(status_cmd)
 
         assert result.exit_code == 0
         assert 'Modularity Status' in result.output
         assert '5' in result.output  # total services
         assert '4' in result.output  # active services
 
+    def test_status_non_json_response(self, mock_api):
+        """Test a non-JSON registry body is reported as an error, not a traceback"""
+        mock_api.get.return_value = _HTML_RESPONSE
 
-class TestListCommand:
-    """Test the list command"""
+        result = _invoke(status_cmd)
 
-    def test_list_services_table(self, runner, mock_api):
-        """Test listing services in table format"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'services': [
-                {
-                    'id': 'service1',
-                    'name': 'Service 1',
-                    'version': '1.0.0',
-                    'status': 'active',
-                    'capabilities': ['cap1', 'cap2'],
-                    'location': 'http://localhost:3001'
-                },
-                {
-                    'id': 'service2',
-                    'name': 'Service 2',
-                    'version': '1.0.0',
-                    'status': 'inactive',
-                    'capabilities': ['cap3'],
-                    'location': 'http://localhost:3002'
-                }
-            ],
-            'count': 2
-        }
-        mock_api.get.return_value = mock_response
+        assert result.exit_code == 1
+        assert 'Error:' in result.output
 
-        result = runner.invoke(cli, ['list'])
 
-        assert result.exit_code == 0
-        assert 'Service 1' in result.output
-        assert 'Service 2' in result.output
-
-    def test_list_services_json(self, runner, mock_api):
-        """Test listing services in JSON format"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'services': [
-                {
-                    'id': 'service1',
-                    'name': 'Service 1',
-                    'version': '1.0.0',
-                    'status': 'active',
-                    'capabilities': ['cap1'],
-                    'location': 'http://localhost:3001'
-                }
-            ],
-            'count': 1
-        }
-        mock_api.get.return_value = mock_response
+class TestListCommand:
+    """Test the list command"""
+
+    @pytest.mark.parametrize("fmt,expected", [
+        ('table', ['Service 1', 'Service 2', '(+2 more)']),
+        ('json', ['"id": "service1"']),
+        ('yaml', ['- capabilities:\n  - cap1\n'])
+    ])
+    def test_list_services(self, mock_api, fmt, expected):
+        """Test listing services in each output format"""
+        mock_api.get.return_value = _LIST_RESPONSE
 
-        result = runner.invoke(cli, ['list', '--format', 'json'])
+        result = _invoke(list_cmd, status=None, format=fmt)
 
         assert result.exit_code == 0
-        assert 'service1' in result.output
+        for text in expected:
+            assert text in result.output
 
     def test_list_services_with_status_filter(self, runner, mock_api):
         """Test listing services with status filter"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'services': [
-                {
-                    'id': 'service1',
-                    'name': 'Service 1',
-                    'version': '1.0.0',
-                    'status': 'active',
-                    'capabilities': ['cap1'],
-                    'location': 'http://localhost:3001'
-                }
-            ],
-            'count': 1
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _LIST_RESPONSE
 
         result = runner.invoke(cli, ['list', '--status', 'active'])
 
@@ -172,23 +370,12 @@ class TestListCommand:
 class TestInfoCommand:
     """Test the info command"""
 
-    def test_info_command(self, runner, mock_api):
+    @pytest.mark.parametrize("fmt", ['table', 'json'])
+    def test_info_command(self, mock_api, fmt):
         """Test getting service info"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'version': '1.0.0',
-            'status': 'active',
-            'mode': 'http',
-            'location': 'http://localhost:3000',
-            'capabilities': ['cap1', 'cap2'],
-            'registered_at': '2024-01-01T00:00:00',
-            'last_seen': '2024-01-01T01:00:00'
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _INFO_RESPONSE
 
-        result = runner.invoke(cli, ['info', 'test-service'])
+        result = _invoke(info_cmd, service_id='test-service', format=fmt)
 
         assert result.exit_code == 0
         assert 'Test Service' in result.output
@@ -196,119 +383,74 @@ class TestInfoCommand:
         assert 'cap1' in result.output
         assert 'cap2' in result.output
 
-    def test_info_command_json(self, runner, mock_api):
-        """Test getting service info in JSON format"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'version': '1.0.0',
-            'status': 'active',
-            'mode': 'http',
-            'location': 'http://localhost:3000',
-            'capabilities': ['cap1'],
-            'registered_at': '2024-01-01T00:00:00',
-            'last_seen': '2024-01-01T01:00:00'
-        }
-        mock_api.get.return_value = mock_response
-
-        result = runner.invoke(cli, ['info', 'test-service', '--format', 'json'])
-
-        assert result.exit_code == 0
-
 
 class TestCapabilitiesCommand:
     """Test the capabilities command"""
 
-    def test_capabilities_command(self, runner, mock_api):
+    @pytest.mark.parametrize("fmt", ['table', 'json'])
+    def test_capabilities_command(self, mock_api, fmt):
         """Test listing capabilities"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'capabilities': [
-                {
-                    'capability': 'cap1',
-                    'providers': ['service1', 'service2'],
-                    'count': 2
-                },
-                {
-                    'capability': 'cap2',
-                    'providers': ['service3'],
-                    'count': 1
-                }
-            ],
-            'count': 2
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _CAPS_RESPONSE
 
-        result = runner.invoke(cli, ['capabilities'])
+        result = _invoke(capabilities_cmd, format=fmt)
 
         assert result.exit_code == 0
         assert 'cap1' in result.output
         assert 'cap2' in result.output
 
-    def test_capabilities_command_json(self, runner, mock_api):
-        """Test listing capabilities in JSON format"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'capabilities': [
-                {
-                    'capability': 'cap1',
-                    'providers': ['service1'],
-                    'count': 1
-                }
-            ],
-            'count': 1
-        }
-        mock_api.get.return_value = mock_response
-
-        result = runner.invoke(cli, ['capabilities', '--format', 'json'])
-
-        assert result.exit_code == 0
-        assert 'cap1' in result.output
-
 
 class TestFindCommand:
     """Test the find command"""
 
-    def test_find_capability_success(self, runner, mock_api):
+    def test_find_capability_success(self, mock_api):
         """Test finding a capability successfully"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'id': 'service1',
-            'name': 'Service 1',
-            'location': 'http://localhost:3000',
-            'status': 'active'
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _FIND_RESPONSE
 
-        result = runner.invoke(cli, ['find', 'test-cap'])
+        result = _invoke(find_cmd, capability_names=('test-cap',))
 
         assert result.exit_code == 0
         assert 'Service 1' in result.output
         assert 'service1' in result.output
 
-    def test_find_capability_not_found(self, runner, mock_api):
+    def test_find_capability_not_found(self, mock_api):
         """Test finding a non-existent capability"""
-        mock_response = Mock()
-        mock_response.raise_for_status.side_effect = Exception("Not found")
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _NOT_FOUND_RESPONSE
 
-        result = runner.invoke(cli, ['find', 'nonexistent-cap'])
+        result = _invoke(find_cmd, capability_names=('nonexistent-cap',))
 
         assert result.exit_code == 1
         assert 'No active services' in result.output
 
+    def test_find_multiple_capabilities(self, mock_api):
+        """Test finding several capabilities in one invocation"""
+        mock_api.get.side_effect = lambda url, **kwargs: (
+            _NOT_FOUND_RESPONSE if url.endswith('/missing-cap') else _FIND_RESPONSE
+        )
+
+        result = _invoke(find_cmd, capability_names=('cap1', 'cap2', 'missing-cap'))
+
+        assert result.exit_code == 1
+        assert mock_api.get.call_count == 3
+        assert result.output.count('Service 1') == 2
+        assert 'No active services provide capability: missing-cap' in result.output
+
+    def test_find_reports_registry_errors(self, mock_api):
+        """Test a failing registry is reported as an error, not as a missing capability"""
+        mock_api.get.side_effect = requests.ConnectionError("Connection refused")
+
+        result = _invoke(find_cmd, capability_names=('test-cap',))
+
+        assert result.exit_code == 1
+        assert 'Error: Connection refused' in result.output
+        assert 'No active services' not in result.output
+
 
 class TestUnregisterCommand:
     """Test the unregister command"""
 
     def test_unregister_command_confirmed(self, runner, mock_api):
         """Test unregistering a service with confirmation"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'message': 'Service unregistered successfully'
-        }
-        mock_api.delete.return_value = mock_response
+        mock_api.delete.return_value = _UNREGISTER_RESPONSE
 
         result = runner.invoke(cli, ['unregister', 'test-service'], input='y\n')
 
@@ -327,103 +469,84 @@ class TestUnregisterCommand:
 class TestInitCommand:
     """Test the init command"""
 
-    def test_init_python_app(self, runner):
-        """Test initializing a Python application"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            result = runner.invoke(cli, [
-                'init',
-                'test-app',
-                'Test App',
-                '--runtime', 'python',
-                '--path', tmpdir
-            ])
-
-            assert result.exit_code == 0
-            assert 'Created new python application' in result.output
-
-            app_path = Path(tmpdir) / 'test-app'
-            assert app_path.exists()
-            assert (app_path / 'app.manifest.json').exists()
-            assert (app_path / 'config.defaults.json').exists()
-            assert (app_path / 'src' / 'module.py').exists()
-            assert (app_path / 'src' / 'standalone.py').exists()
-            assert (app_path / 'adapters').exists()
-
-    def test_init_javascript_app(self, runner):
-        """Test initializing a JavaScript application"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            result = runner.invoke(cli, [
-                'init',
-                'test-app',
-                'Test App',
-                '--runtime', 'javascript',
-                '--path', tmpdir
-            ])
-
-            assert result.exit_code == 0
-
-            app_path = Path(tmpdir) / 'test-app'
-            assert (app_path / 'src' / 'module.js').exists()
-            assert (app_path / 'src' / 'standalone.js').exists()
-
-    def test_init_existing_directory(self, runner):
+    def test_init_app(self, initialized_app):
+        """Test initializing an application"""
+        runtime, _, result, app_path = initialized_app
+
+        assert result.exit_code == 0
+        assert f'Created new {runtime} application' in result.output
+        assert app_path.exists()
+
+    @pytest.mark.parametrize("relpath", [
+        'app.manifest.json',
+        'config.defaults.json',
+        'src/module.{ext}',
+        'src/standalone.{ext}',
+        'adapters'
+    ])
+    def test_init_app_layout(self, initialized_app, relpath):
+        """Test the initialized application has the expected files"""
+        _, ext, _, app_path = initialized_app
+        assert (app_path / relpath.format(ext=ext)).exists()
+
+    @pytest.mark.parametrize("runtime,ext", [
+        ("python", "py"), ("javascript", "js"), ("go", "go"), ("ruby", "rb")
+    ])
+    def test_init_module_entry_extension(self, runner, tmp_path, runtime, ext):
+        """Test the manifest's module entry uses the runtime's file extension"""
+        result = runner.invoke(cli, [
+            'init', 'test-app', 'Test App', '--runtime', runtime, '--path', str(tmp_path)
+        ])
+
+        manifest = json.loads((tmp_path / 'test-app' / 'app.manifest.json').read_text())
+        assert manifest['interfaces']['module']['entry'] == f'src/module.{ext}'
+        assert f'src/module.{ext}' in result.output
+
+    def test_init_existing_directory(self, runner, tmp_path):
         """Test initializing in an existing directory fails"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            app_path = Path(tmpdir) / 'test-app'
-            app_path.mkdir()
+        app_path = tmp_path / 'test-app'
+        app_path.mkdir()
 
-            result = runner.invoke(cli, [
-                'init',
-                'test-app',
-                'Test App',
-                '--path', tmpdir
-            ])
+        result = runner.invoke(cli, [
+            'init',
+            'test-app',
+            'Test App',
+            '--path', str(tmp_path)
+        ])
 
-            assert result.exit_code == 1
-            assert 'already exists' in result.output
+        assert result.exit_code == 1
+        assert 'already exists' in ' '.join(result.output.split())
 
 
 class TestValidateCommand:
     """Test the validate command"""
 
-    def test_validate_valid_manifest(self, runner):
+    def test_validate_valid_manifest(self, runner, valid_manifest_path):
         """Test validating a valid manifest"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manifest_path = Path(tmpdir) / 'app.manifest.json'
-            manifest = {
-                'id': 'test-app',
-                'name': 'Test App',
-                'version': '1.0.0',
-                'runtime': 'python',
-                'provides': {'capabilities': []},
-                'interfaces': {'http': {'port': 3000}}
-            }
-
-            with open(manifest_path, 'w') as f:
-                json.dump(manifest, f)
-
-            result = runner.invoke(cli, ['validate', str(manifest_path)])
-
-            assert result.exit_code == 0
-            assert 'Manifest is valid' in result.output
-
-    def test_validate_invalid_manifest(self, runner):
+        result = runner.invoke(cli, ['validate', str(valid_manifest_path)])
+
+        assert result.exit_code == 0
+        assert 'Manifest is valid' in result.output
+
+    def test_validate_invalid_manifest(self, runner, tmp_path):
         """Test validating an invalid manifest"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manifest_path = Path(tmpdir) / 'app.manifest.json'
-            manifest = {
-                'id': 'test-app',
-                'name': 'Test App'
-                # Missing required fields
-            }
+        manifest_path = tmp_path / 'app.manifest.json'
+        _write_manifest(manifest_path, _INCOMPLETE_MANIFEST)
+
+        result = runner.invoke(cli, ['validate', str(manifest_path)])
+
+        assert result.exit_code == 1
+        assert 'missing required field `version`' in result.output
 
-            with open(manifest_path, 'w') as f:
-                json.dump(manifest, f)
+    def test_validate_mistyped_field(self, runner, tmp_path):
+        """Test validating a manifest with a field of the wrong type"""
+        manifest_path = tmp_path / 'app.manifest.json'
+        _write_manifest(manifest_path, _MISTYPED_MANIFEST)
 
-            result = runner.invoke(cli, ['validate', str(manifest_path)])
+        result = runner.invoke(cli, ['validate', str(manifest_path)])
 
-            assert result.exit_code == 1
-            assert 'Missing required fields' in result.output
+        assert result.exit_code == 1
+        assert '$.provides.capabilities' in result.output
 
     def test_validate_nonexistent_file(self, runner):
         """Test validating a non-existent file"""
@@ -432,46 +555,54 @@ class TestValidateCommand:
         assert result.exit_code == 1
         assert 'Manifest not found' in result.output
 
-    def test_validate_invalid_json(self, runner):
+    def test_validate_invalid_json(self, runner, tmp_path):
         """Test validating invalid JSON"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manifest_path = Path(tmpdir) / 'app.manifest.json'
-            with open(manifest_path, 'w') as f:
-                f.write('{ invalid json }')
+        manifest_path = tmp_path / 'app.manifest.json'
+        manifest_path.write_text('{ invalid json }')
 
-            result = runner.invoke(cli, ['validate', str(manifest_path)])
+        result = runner.invoke(cli, ['validate', str(manifest_path)])
 
-            assert result.exit_code == 1
-            assert 'Invalid JSON' in result.output
+        assert result.exit_code == 1
+        assert 'Invalid JSON' in result.output
 
 
 class TestRunCommand:
     """Test the run command"""
 
-    def test_run_python_app(self, runner):
+    def test_run_python_app(self, runner, valid_manifest_path, exec_calls):
         """Test running a Python application"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            manifest_path = Path(tmpdir) / 'app.manifest.json'
-            manifest = {
-                'id': 'test-app',
-                'name': 'Test App',
-                'runtime': 'python'
-            }
+        manifest_path = valid_manifest_path
+        standalone_script = manifest_path.parent / 'src' / 'standalone.py'
+
+        runner.invoke(cli, ['run', '--manifest', str(manifest_path), '--port', '3100'])
 
-            with open(manifest_path, 'w') as f:
-                json.dump(manifest, f)
+        # The CLI process is replaced by the app, run from its directory
+        assert exec_calls['chdir'] == [manifest_path.parent]
+        assert len(exec_calls['execvpe']) == 1
+        file, args, env = exec_calls['execvpe'][0]
+        assert file == sys.executable
+        assert args == [sys.executable, str(standalone_script.resolve())]
+        assert env['MODULE_HOST'] == '127.0.0.1'
+        assert env['MODULE_PORT'] == '3100'
 
-            # Create dummy standalone script
-            src_dir = Path(tmpdir) / 'src'
-            src_dir.mkdir()
-            standalone_script = src_dir / 'standalone.py'
-            standalone_script.write_text('print("Running")')
+    def test_run_missing_runtime_binary(self, runner, valid_manifest_path, exec_calls):
+        """Test a runtime that can't be exec'd is reported and the cwd restored"""
+        with patch('os.execvpe', side_effect=FileNotFoundError(2, 'No such file or directory')):
+            result = runner.invoke(cli, ['run', '--manifest', str(valid_manifest_path)])
 
-            with patch('modularity_cli.cli.subprocess.run') as mock_run:
-                result = runner.invoke(cli, ['run', '--manifest', str(manifest_path)])
+        assert result.exit_code == 1
+        assert 'Could not start' in result.output
+        assert exec_calls['chdir'] == [valid_manifest_path.parent, os.getcwd()]
+
+    def test_run_manifest_without_runtime(self, runner, tmp_path):
+        """Test running with a manifest that does not declare a runtime"""
+        manifest_path = tmp_path / 'app.manifest.json'
+        _write_manifest(manifest_path, _INCOMPLETE_MANIFEST)
 
-                # Check that subprocess.run was called
-                mock_run.assert_called_once()
+        result = runner.invoke(cli, ['run', '--manifest', str(manifest_path)])
+
+        assert result.exit_code == 1
+        assert 'missing required field `runtime`' in result.output
 
     def test_run_nonexistent_manifest(self, runner):
         """Test running with non-existent manifest"""
@@ -484,67 +615,31 @@ class TestRunCommand:
 class TestUtilityFunctions:
     """Test utility functions"""
 
-    def test_get_extension(self):
-        """Test getting file extensions for runtimes"""
-        assert _get_extension('python') == 'py'
-        assert _get_extension('javascript') == 'js'
-        assert _get_extension('go') == 'go'
-        assert _get_extension('ruby') == 'rb'
-        assert _get_extension('unknown') == 'txt'
+    def test_create_template_files(self, template_dir):
+        """Test creating template files"""
+        ext, app_path = template_dir
 
-    def test_create_template_files_python(self):
-        """Test creating Python template files"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            app_path = Path(tmpdir)
-            (app_path / "src").mkdir()
+        assert (app_path / "src" / f"module.{ext}").exists()
+        assert (app_path / "src" / f"standalone.{ext}").exists()
 
-            _create_template_files(app_path, 'python')
-
-            assert (app_path / "src" / "module.py").exists()
-            assert (app_path / "src" / "standalone.py").exists()
-
-            # Check content
-            module_content = (app_path / "src" / "module.py").read_text()
-            assert 'class AppModule' in module_content
-            assert 'ModuleInterface' in module_content
-
-    def test_create_template_files_javascript(self):
-        """Test creating JavaScript template files"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            app_path = Path(tmpdir)
-            (app_path / "src").mkdir()
-
-            _create_template_files(app_path, 'javascript')
-
-            assert (app_path / "src" / "module.js").exists()
-            assert (app_path / "src" / "standalone.js").exists()
-
-            # Check content
-            module_content = (app_path / "src" / "module.js").read_text()
-            assert 'class AppModule' in module_content
+        # Check content
+        module_content = (app_path / "src" / f"module.{ext}").read_text()
+        assert 'class AppModule' in module_content
+        assert 'ModuleInterface' in module_content
 
 
+@pytest.mark.xdist_group("cli-config")
 class TestCLIOptions:
     """Test CLI global options"""
 
-    def test_custom_registry_option(self, runner, mock_api):
+    def test_custom_registry_option(self, runner, mock_api, config_file, helper_registry):
         """Test using custom registry URL"""
-        mock_response = Mock()
-        mock_response.json.return_value = {
-            'total_services': 0,
-            'active_services': 0,
-            'inactive_services': 0,
-            'total_capabilities': 0,
-            'services_by_runtime': {}
-        }
-        mock_api.get.return_value = mock_response
+        mock_api.get.return_value = _STATUS_RESPONSE
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_file = Path(tmpdir) / "cli-config.json"
-            with patch('modularity_cli.cli.CONFIG_FILE', config_file):
-                result = runner.invoke(cli, ['--registry', 'http://custom:5000', 'status'])
+        result = runner.invoke(cli, ['--registry', 'http://custom:5000', 'status'])
 
-                assert result.exit_code == 0
+        assert result.exit_code == 0
+        assert mock_api.get.call_args.args[0] == 'http://custom:5000/api/stats'
 
 
 if __name__ == '__main__':
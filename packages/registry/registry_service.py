@@ -3,17 +3,25 @@ Modularity Registry Service
 Central service for discovering and managing modules in the ecosystem
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request
 from flask_cors import CORS
-from typing import Dict, List, Any
+from typing import Dict, Any, Callable, Optional
+from collections import OrderedDict
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-import json
+import orjson
 from pathlib import Path
 from urllib.parse import urlparse
 import ipaddress
+import atexit
+import functools
+import secrets
+import zlib
 import os
 
 
@@ -26,8 +34,77 @@ CORS(app, origins=allowed_origins, supports_credentials=True)
 
 # In-memory registry (can be replaced with Redis or database)
 registry: Dict[str, Dict[str, Any]] = {}
-capability_index: Dict[str, List[str]] = {}  # capability -> [service_ids]
-registry_lock = threading.Lock()
+# capability -> {service_id: None}: a dict used as an ordered set, so providers
+# stay in registration order
+capability_index: Dict[str, Dict[str, None]] = {}
+last_heartbeat: Dict[str, float] = {}  # service_id -> time.monotonic() of its last heartbeat
+
+
+class RWLock:
+    """Reader/writer lock: any number of concurrent readers, or one writer
+
+    Entering the lock itself (``with registry_lock:``) takes it exclusively, so
+    it is a drop-in replacement for threading.Lock; read-only code uses
+    ``with registry_lock.read():``. Waiting writers block new readers so a
+    steady stream of reads cannot starve them.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        # Bumped by registry_changed(); stable while a reader holds the lock
+        self.version = 0
+
+    @contextmanager
+    def read(self):
+        """Hold the lock shared for the duration of the block"""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire(self):
+        """Take the lock exclusively"""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release(self):
+        """Release an exclusive hold"""
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+registry_lock = RWLock()
+
+
+def registry_changed():
+    """Record a change to registry or capability_index; caller holds registry_lock exclusively
+
+    Invalidates cached responses and ETags. Timestamp-only updates (last_seen)
+    don't call this, so routine heartbeats keep the caches warm.
+    """
+    registry_lock.version += 1
 
 # Health check configuration
 HEALTH_CHECK_INTERVAL = 30  # seconds
@@ -35,17 +112,59 @@ HEALTH_CHECK_TIMEOUT = 5    # seconds
 MAX_FAILED_CHECKS = 3
 
 
+def _create_http_session() -> requests.Session:
+    """Session shared by all health probes, so connections to services are kept alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+http_session = _create_http_session()
+atexit.register(http_session.close)
+
+# Probes run concurrently; threads are only started once there is work
+HEALTH_CHECK_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+health_check_executor = ThreadPoolExecutor(
+    max_workers=HEALTH_CHECK_WORKERS,
+    thread_name_prefix='health-check'
+)
+
+
 class RegistryStore:
-    """Persistent storage for registry data"""
+    """Persistent storage for registry data
+
+    Null fields aren't written; load() restores them from FIELD_DEFAULTS.
+    """
 
-    def __init__(self, storage_path: str = "~/.ecosystem/registry.json"):
-        self.storage_path = Path(storage_path).expanduser()
+    # Optional service fields a client may send as null
+    FIELD_DEFAULTS = {'version': None, 'metadata': None}
+
+    def __init__(self, storage_path: Optional[str] = None, fmt: str = 'json'):
+        if fmt == 'json':
+            self._dumps = functools.partial(orjson.dumps, option=orjson.OPT_INDENT_2)
+            self._loads = orjson.loads
+        elif fmt == 'msgpack':
+            import msgpack  # optional dependency: pip install modularity-registry[msgpack]
+            self._dumps = functools.partial(msgpack.packb, use_bin_type=True)
+            self._loads = functools.partial(msgpack.unpackb, raw=False)
+        else:
+            raise ValueError(f"Unsupported registry store format: {fmt}")
+
+        self.storage_path = Path(storage_path or f"~/.ecosystem/registry.{fmt}").expanduser()
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
 
     def save(self, data: Dict):
-        """Save registry to disk"""
-        with open(self.storage_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Save registry to disk (atomically, so a crash never leaves half a file)"""
+        tmp_path = self.storage_path.with_name(self.storage_path.name + '.tmp')
+        compact = {
+            service_id: {k: v for k, v in service.items() if v is not None}
+            for service_id, service in data.items()
+        }
+        tmp_path.write_bytes(self._dumps(compact))
+        os.replace(tmp_path, self.storage_path)
 
     def load(self) -> Dict:
         """Load registry from disk"""
@@ -53,20 +172,163 @@ class RegistryStore:
             return {}
 
         try:
-            with open(self.storage_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError, IOError) as e:
+            data = self._loads(self.storage_path.read_bytes())
+        except (ValueError, OSError) as e:  # decode errors of both formats are ValueErrors
             print(f"Error loading registry: {e}")
             return {}
 
+        defaults = self.FIELD_DEFAULTS
+        return {
+            service_id: {**defaults, **service}
+            for service_id, service in data.items()
+        }
+
 
-store = RegistryStore()
+# REGISTRY_STORE_FORMAT=msgpack stores a smaller, faster-to-load binary file
+store = RegistryStore(fmt=os.getenv('REGISTRY_STORE_FORMAT', 'json'))
 
+# Writes are coalesced: mutations only flag the registry as dirty and a
+# background writer saves it at most once per SAVE_DELAY
+SAVE_DELAY = 0.5  # seconds
+save_requested = threading.Event()
+# One save at a time: the writer thread and the atexit flush share store's .tmp file
+save_lock = threading.Lock()
 
+
+def request_save():
+    """Ask the writer thread to persist the registry shortly"""
+    save_requested.set()
+
+
+def save_registry():
+    """Write a snapshot of the registry to disk"""
+    with save_lock:
+        with registry_lock.read():
+            # Copy each service so encoding can happen outside the registry lock
+            snapshot = {service_id: dict(service) for service_id, service in registry.items()}
+        store.save(snapshot)
+
+
+def store_writer_worker():
+    """Background worker that persists the registry after it changes"""
+    while True:
+        save_requested.wait()
+        time.sleep(SAVE_DELAY)
+        # Changes made from here on flag the registry again for the next write
+        save_requested.clear()
+        try:
+            save_registry()
+        except Exception as e:
+            # Not just OSError: an unencodable value must not kill the writer,
+            # or every later change would silently go unsaved
+            print(f"Error saving registry: {e}")
+
+
+@atexit.register
+def _flush_pending_save():
+    """Don't lose changes still waiting for the writer thread"""
+    if save_requested.is_set():
+        save_registry()
+
+
+def jsonify(obj: Any):
+    """JSON response encoded with orjson, which produces bytes directly"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+def parse_json() -> Any:
+    """Request body decoded straight from the raw bytes with orjson, or None if it isn't JSON"""
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+
+
+class ResponseCache:
+    """Encoded bodies of the list endpoints: bounded LRU with a time-to-live
+
+    Keys end with registry_lock.version, so every change to the registry
+    makes the old entries unreachable; the TTL lets those dead entries age
+    out instead of waiting for LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = HEALTH_CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, body)
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        """Return the cached body for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, body: bytes):
+        """Cache body under key"""
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, body)
+            self._entries.move_to_end(key)
+            # Drop from the least recently used end: anything over the size
+            # bound, and any expired entries found there
+            while self._entries:
+                oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+                if len(self._entries) <= self.max_entries and expires_at > now:
+                    break
+                del self._entries[oldest_key]
+
+
+response_cache = ResponseCache()
+
+
+# Distinguishes ETags across restarts, when registry_lock.version starts over
+_ETAG_SEED = secrets.token_hex(4)
+
+
+def cached_response(key: tuple, build: Callable[..., Any], *args):
+    """
+    Respond with build(*args) as JSON, re-encoding only after the registry changes.
+
+    build runs under registry_lock (held for reading) and must return data
+    writers will not mutate afterwards; encoding happens after the lock is
+    released. The response carries a weak ETag derived from the registry
+    version, and a client that already holds it gets 304 Not Modified.
+    """
+    with registry_lock.read():
+        version = registry_lock.version
+        etag = f"{_ETAG_SEED}.{version}.{zlib.crc32(repr(key).encode()):08x}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        key = (*key, version)
+        body = response_cache.get(key)
+        if body is None:
+            payload = build(*args)
+
+    if body is None:
+        body = orjson.dumps(payload)
+        response_cache.put(key, body)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    return response
+
+
+@functools.lru_cache(maxsize=4096)
 def is_safe_url(url: str) -> bool:
     """
     Validate URL to prevent SSRF attacks.
     Only allows localhost and private network addresses for health checks.
+    The answer depends only on the URL, so it is cached: health checks ask
+    about the same URLs every cycle.
     """
     try:
         parsed = urlparse(url)
@@ -107,103 +369,134 @@ def rebuild_capability_index():
 
         for service_id, service_info in registry.items():
             for capability in service_info.get('capabilities', []):
-                if capability not in capability_index:
-                    capability_index[capability] = []
-                capability_index[capability].append(service_id)
+                capability_index.setdefault(capability, {})[service_id] = None
 
+        registry_changed()
 
-def health_check_worker():
-    """Background worker to check health of registered services"""
-    while True:
-        time.sleep(HEALTH_CHECK_INTERVAL)
 
-        services_to_check = list(registry.keys())
-        for service_id in services_to_check:
-            with registry_lock:
-                service = registry.get(service_id)
-                if not service:
-                    continue
+def _probe(health_url: str) -> bool:
+    """Probe one health endpoint; True if it answered 200"""
+    # The body is read in full, returning the connection to the session's
+    # pool for the next cycle
+    try:
+        response = http_session.get(health_url, timeout=HEALTH_CHECK_TIMEOUT)
+    except requests.RequestException:
+        return False
+    return response.status_code == 200
 
-                # Only check HTTP services
-                if service['mode'] != 'http':
-                    continue
 
-                location = service['location']
+def _record_health(service_id: str, healthy: bool, now_iso: str):
+    """
+    Apply one probe result to the registry; now_iso is the cycle's timestamp.
+    Caller holds registry_lock exclusively.
+    """
+    service = registry.get(service_id)
+    if not service:
+        return
+    before = (service['status'], service['failed_checks'])
+
+    if healthy:
+        service['status'] = 'active'
+        service['failed_checks'] = 0
+        service['last_seen'] = now_iso
+    else:
+        service['failed_checks'] += 1
+
+    # Mark as inactive if too many failed checks
+    failed = service.get('failed_checks', 0)
+    if failed >= MAX_FAILED_CHECKS:
+        service['status'] = 'inactive'
+        print(f"Service {service_id} marked as inactive after {failed} failed checks")
+
+    if (service['status'], service['failed_checks']) != before:
+        registry_changed()
+
+
+def run_health_checks():
+    """Probe every registered HTTP service concurrently and record the results"""
+    # A service that sent a heartbeat within the last interval is known to be
+    # up; probing it as well would only repeat what it just told us
+    fresh_since = time.monotonic() - HEALTH_CHECK_INTERVAL
+
+    with registry_lock.read():
+        # Only check HTTP services
+        targets = [
+            (service_id, service['location'])
+            for service_id, service in registry.items()
+            if service['mode'] == 'http'
+            and last_heartbeat.get(service_id, float('-inf')) < fresh_since
+        ]
+
+    probes = []
+    for service_id, location in targets:
+        # Validate URL to prevent SSRF attacks
+        health_url = f"{location}/_module/health"
+        if not is_safe_url(health_url):
+            print(f"Skipping health check for {service_id}: URL not allowed (SSRF protection)")
+            continue
+        probes.append((service_id, health_url))
+
+    if not probes:
+        return
+
+    # A cycle takes about as long as the slowest probe rather than the sum of them
+    results = [*health_check_executor.map(_probe, [health_url for _, health_url in probes])]
+
+    # One timestamp serves every service that answered in this cycle, and
+    # all results are applied in a single critical section
+    now_iso = datetime.now().isoformat()
+    with registry_lock:
+        for (service_id, _), healthy in zip(probes, results):
+            _record_health(service_id, healthy, now_iso)
 
-            # Validate URL to prevent SSRF attacks
-            health_url = f"{location}/_module/health"
-            if not is_safe_url(health_url):
-                print(f"Skipping health check for {service_id}: URL not allowed (SSRF protection)")
-                continue
 
-            # Perform health check
-            try:
-                response = requests.get(
-                    health_url,
-                    timeout=HEALTH_CHECK_TIMEOUT
-                )
-
-                with registry_lock:
-                    if service_id in registry:
-                        if response.status_code == 200:
-                            registry[service_id]['status'] = 'active'
-                            registry[service_id]['failed_checks'] = 0
-                            registry[service_id]['last_seen'] = datetime.now().isoformat()
-                        else:
-                            registry[service_id]['failed_checks'] += 1
-
-            except requests.RequestException:
-                with registry_lock:
-                    if service_id in registry:
-                        registry[service_id]['failed_checks'] += 1
-
-            # Mark as inactive if too many failed checks
-            with registry_lock:
-                if service_id in registry:
-                    failed = registry[service_id].get('failed_checks', 0)
-                    if failed >= MAX_FAILED_CHECKS:
-                        registry[service_id]['status'] = 'inactive'
-                        print(f"Service {service_id} marked as inactive after {failed} failed checks")
+def health_check_worker():
+    """Background worker to check health of registered services"""
+    while True:
+        time.sleep(HEALTH_CHECK_INTERVAL)
+        run_health_checks()
 
 
-@app.route('/api/register', methods=['POST'])
-def register_service():
-    """Register a new service in the ecosystem"""
-    # Validate JSON payload exists
-    if not request.json:
-        return jsonify({'error': 'Invalid JSON payload'}), 400
+# Registration schema, checked by validate_registration()
+REQUIRED_FIELDS = ('id', 'name', 'capabilities', 'location', 'mode')
+VALID_MODES = frozenset({'http', 'embedded', 'standalone'})
 
-    data = request.json
 
+def validate_registration(data: Any) -> Optional[str]:
+    """Check a registration payload; returns an error message, or None if it is valid"""
     # Validate required fields exist
-    required_fields = ['id', 'name', 'capabilities', 'location', 'mode']
-    if not all(field in data for field in required_fields):
-        return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(data, dict) or not all(field in data for field in REQUIRED_FIELDS):
+        return 'Missing required fields'
 
     # Validate field types and formats
     if not isinstance(data['id'], str) or not data['id'].strip():
-        return jsonify({'error': 'id must be a non-empty string'}), 400
+        return 'id must be a non-empty string'
 
     if not isinstance(data['name'], str) or not data['name'].strip():
-        return jsonify({'error': 'name must be a non-empty string'}), 400
+        return 'name must be a non-empty string'
 
     if not isinstance(data['capabilities'], list):
-        return jsonify({'error': 'capabilities must be a list'}), 400
+        return 'capabilities must be a list'
 
     if not all(isinstance(cap, str) for cap in data['capabilities']):
-        return jsonify({'error': 'All capabilities must be strings'}), 400
+        return 'All capabilities must be strings'
 
     if not isinstance(data['location'], str) or not data['location'].strip():
-        return jsonify({'error': 'location must be a non-empty string'}), 400
+        return 'location must be a non-empty string'
 
     # Validate location URL format
     if not is_safe_url(data['location']):
-        return jsonify({'error': 'location must be a valid localhost or private network URL'}), 400
+        return 'location must be a valid localhost or private network URL'
+
+    if not isinstance(data['mode'], str) or data['mode'] not in VALID_MODES:
+        return 'mode must be one of: http, embedded, standalone'
 
-    if not isinstance(data['mode'], str) or data['mode'] not in ('http', 'embedded', 'standalone'):
-        return jsonify({'error': 'mode must be one of: http, embedded, standalone'}), 400
+    return None
 
-    service_info = {
+
+def build_service_info(data: Dict[str, Any], now_iso: str) -> Dict[str, Any]:
+    """Registry entry for a validated registration payload"""
+    return {
         'id': data['id'],
         'name': data['name'],
         'version': data.get('version', '1.0.0'),
@@ -211,24 +504,42 @@ def register_service():
         'location': data['location'],
         'mode': data['mode'],
         'status': 'active',
-        'registered_at': datetime.now().isoformat(),
-        'last_seen': datetime.now().isoformat(),
+        'registered_at': now_iso,
+        'last_seen': now_iso,
         'failed_checks': 0,
         'metadata': data.get('metadata', {})
     }
 
-    with registry_lock:
-        registry[data['id']] = service_info
 
-        # Update capability index
-        for capability in data['capabilities']:
-            if capability not in capability_index:
-                capability_index[capability] = []
-            if data['id'] not in capability_index[capability]:
-                capability_index[capability].append(data['id'])
+def add_service(service_info: Dict[str, Any]):
+    """Store a service and index its capabilities; caller must hold registry_lock exclusively"""
+    registry[service_info['id']] = service_info
+    registry_changed()
+
+    # Update capability index
+    for capability in service_info['capabilities']:
+        capability_index.setdefault(capability, {})[service_info['id']] = None
+
+
+@app.route('/api/register', methods=['POST'])
+def register_service():
+    """Register a new service in the ecosystem"""
+    # Validate JSON payload exists
+    data = parse_json()
+    if not data:
+        return jsonify({'error': 'Invalid JSON payload'}), 400
 
-        # Save to disk
-        store.save(registry)
+    error = validate_registration(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    service_info = build_service_info(data, datetime.now().isoformat())
+
+    with registry_lock:
+        add_service(service_info)
+
+        # Persist in the background, outside this critical section
+        request_save()
 
     return jsonify({
         'message': 'Service registered successfully',
@@ -236,6 +547,38 @@ def register_service():
     }), 201
 
 
+@app.route('/api/register_bulk', methods=['POST'])
+def register_services_bulk():
+    """Register several services in one request, all or nothing"""
+    # Validate JSON payload exists
+    data = parse_json()
+    if not data:
+        return jsonify({'error': 'Invalid JSON payload'}), 400
+
+    if not isinstance(data, list):
+        return jsonify({'error': 'Payload must be a list of services'}), 400
+
+    # Validate everything before touching the registry
+    for i, service in enumerate(data):
+        error = validate_registration(service)
+        if error:
+            return jsonify({'error': f'services[{i}]: {error}'}), 400
+
+    now_iso = datetime.now().isoformat()
+    services = [build_service_info(service, now_iso) for service in data]
+
+    with registry_lock:
+        for service_info in services:
+            add_service(service_info)
+
+        request_save()
+
+    return jsonify({
+        'message': 'Services registered successfully',
+        'registered': [service_info['id'] for service_info in services]
+    }), 201
+
+
 @app.route('/api/unregister/<service_id>', methods=['DELETE'])
 def unregister_service(service_id: str):
     """Unregister a service from the ecosystem"""
@@ -246,85 +589,94 @@ def unregister_service(service_id: str):
         # Remove from capability index
         service_caps = registry[service_id]['capabilities']
         for capability in service_caps:
-            if capability in capability_index:
-                capability_index[capability] = [
-                    sid for sid in capability_index[capability]
-                    if sid != service_id
-                ]
-                if not capability_index[capability]:
+            providers = capability_index.get(capability)
+            if providers is not None:
+                providers.pop(service_id, None)
+                if not providers:
                     del capability_index[capability]
 
         # Remove service
         del registry[service_id]
+        last_heartbeat.pop(service_id, None)
+        registry_changed()
 
-        # Save to disk
-        store.save(registry)
+        # Persist in the background, outside this critical section
+        request_save()
 
     return jsonify({'message': 'Service unregistered successfully'}), 200
 
 
+def _services_payload(status_filter):
+    """Body of GET /api/services (caller holds registry_lock)"""
+    # Copies, since health checks update service dicts in place
+    services = [
+        dict(s) for s in registry.values()
+        if not status_filter or s['status'] == status_filter
+    ]
+
+    return {
+        'services': services,
+        'count': len(services)
+    }
+
+
 @app.route('/api/services', methods=['GET'])
 def list_services():
     """List all registered services"""
     status_filter = request.args.get('status')
 
-    with registry_lock:
-        services = list(registry.values())
-
-        if status_filter:
-            services = [s for s in services if s['status'] == status_filter]
-
-        return jsonify({
-            'services': services,
-            'count': len(services)
-        })
+    return cached_response(('services', status_filter), _services_payload, status_filter)
 
 
 @app.route('/api/services/<service_id>', methods=['GET'])
 def get_service(service_id: str):
     """Get details of a specific service"""
-    with registry_lock:
+    with registry_lock.read():
         if service_id not in registry:
             return jsonify({'error': 'Service not found'}), 404
 
         return jsonify(registry[service_id])
 
 
+def _capabilities_payload():
+    """Body of GET /api/capabilities (caller holds registry_lock)"""
+    capabilities = []
+    for capability, service_ids in capability_index.items():
+        # Only include active services, in registration order
+        active_services = [
+            sid for sid in service_ids
+            if registry.get(sid, {}).get('status') == 'active'
+        ]
+
+        if active_services:
+            capabilities.append({
+                'capability': capability,
+                'providers': active_services,
+                'count': len(active_services)
+            })
+
+    return {
+        'capabilities': capabilities,
+        'count': len(capabilities)
+    }
+
+
 @app.route('/api/capabilities', methods=['GET'])
 def list_capabilities():
     """List all available capabilities"""
-    with registry_lock:
-        capabilities = []
-        for capability, service_ids in capability_index.items():
-            # Only include active services
-            active_services = [
-                sid for sid in service_ids
-                if registry.get(sid, {}).get('status') == 'active'
-            ]
-
-            if active_services:
-                capabilities.append({
-                    'capability': capability,
-                    'providers': active_services,
-                    'count': len(active_services)
-                })
-
-        return jsonify({
-            'capabilities': capabilities,
-            'count': len(capabilities)
-        })
+    return cached_response(('capabilities',), _capabilities_payload)
 
 
 @app.route('/api/capabilities/<capability_name>', methods=['GET'])
 def get_capability(capability_name: str):
     """Find a service providing a specific capability"""
-    with registry_lock:
+    with registry_lock.read():
         if capability_name not in capability_index:
             return jsonify({'error': 'Capability not found'}), 404
 
         service_ids = capability_index[capability_name]
 
-        # Find first active service
+        # First active provider, in registration order
         for service_id in service_ids:
             service = registry.get(service_id)
             if service and service['status'] == 'active':
@@ -341,45 +693,55 @@ def heartbeat(service_id: str):
         if service_id not in registry:
             return jsonify({'error': 'Service not found'}), 404
 
-        registry[service_id]['last_seen'] = datetime.now().isoformat()
-        registry[service_id]['status'] = 'active'
-        registry[service_id]['failed_checks'] = 0
+        service = registry[service_id]
+        service['last_seen'] = datetime.now().isoformat()
+        last_heartbeat[service_id] = time.monotonic()
+        # Reviving a service changes what the list endpoints return; a
+        # heartbeat from one that is already active only moves last_seen
+        if service['status'] != 'active' or service['failed_checks']:
+            service['status'] = 'active'
+            service['failed_checks'] = 0
+            registry_changed()
 
         return jsonify({'message': 'Heartbeat received'})
 
 
+def _stats_payload():
+    """Body of GET /api/stats (caller holds registry_lock)"""
+    total_services = len(registry)
+    active_services = sum(1 for s in registry.values() if s['status'] == 'active')
+    inactive_services = total_services - active_services
+    total_capabilities = len(capability_index)
+
+    # Group by runtime
+    by_runtime = {}
+    for service in registry.values():
+        runtime = service.get('metadata', {}).get('runtime', 'unknown')
+        by_runtime[runtime] = by_runtime.get(runtime, 0) + 1
+
+    return {
+        'total_services': total_services,
+        'active_services': active_services,
+        'inactive_services': inactive_services,
+        'total_capabilities': total_capabilities,
+        'services_by_runtime': by_runtime
+    }
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get registry statistics"""
-    with registry_lock:
-        total_services = len(registry)
-        active_services = sum(1 for s in registry.values() if s['status'] == 'active')
-        inactive_services = total_services - active_services
-        total_capabilities = len(capability_index)
-
-        # Group by runtime
-        by_runtime = {}
-        for service in registry.values():
-            runtime = service.get('metadata', {}).get('runtime', 'unknown')
-            by_runtime[runtime] = by_runtime.get(runtime, 0) + 1
-
-        return jsonify({
-            'total_services': total_services,
-            'active_services': active_services,
-            'inactive_services': inactive_services,
-            'total_capabilities': total_capabilities,
-            'services_by_runtime': by_runtime
-        })
+    return cached_response(('stats',), _stats_payload)
 
 
 @app.route('/api/discover', methods=['POST'])
 def discover_services():
     """Discover services based on requirements"""
     # Validate JSON payload exists
-    if not request.json:
+    data = parse_json()
+    if not data or not isinstance(data, dict):
         return jsonify({'error': 'Invalid JSON payload'}), 400
 
-    data = request.json
     required_capabilities = data.get('capabilities', [])
     optional_capabilities = data.get('optional', [])
 
@@ -396,37 +758,49 @@ def discover_services():
     if not all(isinstance(cap, str) for cap in optional_capabilities):
         return jsonify({'error': 'All optional capabilities must be strings'}), 400
 
-    with registry_lock:
+    required_caps = set(required_capabilities)
+    optional_caps = set(optional_capabilities)
+
+    with registry_lock.read():
+        # Candidates come from the capability index instead of scanning every
+        # registered service: walk the smallest provider dict (in registration
+        # order) and keep the services that also provide the other capabilities
+        if required_caps:
+            provider_sets = sorted(
+                (capability_index.get(cap, {}) for cap in required_caps), key=len
+            )
+            others = provider_sets[1:]
+            candidates = [
+                sid for sid in provider_sets[0] if all(sid in other for other in others)
+            ]
+        else:
+            candidates = registry
+
         matching_services = []
 
-        for service_id, service in registry.items():
-            if service['status'] != 'active':
+        for service_id in candidates:
+            service = registry.get(service_id)
+            if not service or service['status'] != 'active':
                 continue
 
-            service_caps = set(service['capabilities'])
-            required_caps = set(required_capabilities)
-            optional_caps = set(optional_capabilities)
-
-            # Check if service provides all required capabilities
-            if required_caps.issubset(service_caps):
-                # Calculate match score
-                optional_matches = len(optional_caps.intersection(service_caps))
-                match_score = len(required_caps) + optional_matches
+            # Calculate match score
+            provided_optional = optional_caps.intersection(service['capabilities'])
+            match_score = len(required_caps) + len(provided_optional)
 
-                matching_services.append({
-                    'service': service,
-                    'match_score': match_score,
-                    'provides_required': list(required_caps),
-                    'provides_optional': list(optional_caps.intersection(service_caps))
-                })
+            matching_services.append({
+                'service': dict(service),
+                'match_score': match_score,
+                'provides_required': list(required_caps),
+                'provides_optional': list(provided_optional)
+            })
 
-        # Sort by match score
-        matching_services.sort(key=lambda x: x['match_score'], reverse=True)
+    # Sort by match score (outside the lock; the matches hold copies)
+    matching_services.sort(key=lambda x: x['match_score'], reverse=True)
 
-        return jsonify({
-            'matches': matching_services,
-            'count': len(matching_services)
-        })
+    return jsonify({
+        'matches': matching_services,
+        'count': len(matching_services)
+    })
 
 
 @app.route('/health', methods=['GET'])
@@ -455,6 +829,10 @@ def init_registry():
     health_thread.start()
     print("Health check worker started")
 
+    # Start the background writer
+    writer_thread = threading.Thread(target=store_writer_worker, daemon=True)
+    writer_thread.start()
+
 
 if __name__ == '__main__':
     init_registry()
@@ -465,6 +843,7 @@ if __name__ == '__main__':
     print("Starting on http://localhost:5000")
     print("API Documentation:")
     print("  POST   /api/register          - Register a service")
+    print("  POST   /api/register_bulk     - Register several services at once")
     print("  DELETE /api/unregister/<id>   - Unregister a service")
     print("  GET    /api/services          - List all services")
     print("  GET    /api/services/<id>     - Get service details")
@@ -0,0 +1,20 @@
+"""
+Shared fixtures for the Modularity Registry Service tests
+"""
+
+import pytest
+
+# Imported here so Flask, werkzeug and orjson load once, before any test module
+from registry_service import app
+
+app.config['TESTING'] = True
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Create a test client for the Flask app, shared by all tests
+
+    The client holds no registry state; clear_registry still resets that per test.
+    """
+    with app.test_client() as client:
+        yield client
@@ -3,25 +3,80 @@ Tests for the Modularity Registry Service
 """
 
 import pytest
-import json
-import tempfile
-from pathlib import Path
-from unittest.mock import Mock, patch, MagicMock
-import sys
-import os
-
-# Add parent directory to path to import registry_service
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from registry_service import app, registry, capability_index, registry_lock, RegistryStore, rebuild_capability_index
+import orjson
+import requests
+import threading
+from unittest.mock import Mock, patch
+
+import registry_service
+from registry_service import (
+    registry, capability_index, registry_lock, RegistryStore, rebuild_capability_index,
+    run_health_checks, MAX_FAILED_CHECKS, RWLock, last_heartbeat, save_requested, save_registry,
+    ResponseCache, registry_changed
+)
+
+
+# Payloads shared by several tests, encoded once
+SERVICE1 = {
+    'id': 'service1',
+    'name': 'Service 1',
+    'capabilities': ['cap1'],
+    'location': 'http://localhost:3001',
+    'mode': 'http'
+}
+SERVICE2 = {
+    'id': 'service2',
+    'name': 'Service 2',
+    'capabilities': ['cap2'],
+    'location': 'http://localhost:3002',
+    'mode': 'http'
+}
+DISCOVER_SERVICE1 = {
+    'id': 'service1',
+    'name': 'Service 1',
+    'capabilities': ['cap1', 'cap2', 'cap3'],
+    'location': 'http://localhost:3001',
+    'mode': 'http'
+}
+DISCOVER_SERVICE2 = {
+    'id': 'service2',
+    'name': 'Service 2',
+    'capabilities': ['cap1', 'cap2'],
+    'location': 'http://localhost:3002',
+    'mode': 'http'
+}
+SERVICE1_BYTES = orjson.dumps(SERVICE1)
+SERVICE2_BYTES = orjson.dumps(SERVICE2)
+SERVICES_BYTES = orjson.dumps([SERVICE1, SERVICE2])
+DISCOVER_SERVICES_BYTES = orjson.dumps([DISCOVER_SERVICE1, DISCOVER_SERVICE2])
+DISCOVER_CAP12_BYTES = orjson.dumps({'capabilities': ['cap1', 'cap2']})
+
+
+TEST_SERVICE = {
+    'id': 'test-service',
+    'name': 'Test Service',
+    'capabilities': ['test-cap'],
+    'location': 'http://localhost:3000',
+    'mode': 'http'
+}
+
+
+def _seed(service, **overrides):
+    """Put a registered service straight into the registry, skipping the HTTP round-trip
+
+    Active with no failed checks unless overrides (e.g. status='inactive') say otherwise.
+    """
+    with registry_lock:
+        registry[service['id']] = {**service, 'status': 'active', 'failed_checks': 0, **overrides}
+        for cap in service['capabilities']:
+            capability_index.setdefault(cap, {})[service['id']] = None
+        registry_changed()
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the Flask app"""
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
+def _post(client, path, obj):
+    """POST obj (or an already encoded body) to path as JSON"""
+    body = obj if isinstance(obj, bytes) else orjson.dumps(obj)
+    return client.post(path, data=body, content_type='application/json')
 
 
 @pytest.fixture(autouse=True)
@@ -30,42 +85,96 @@ def clear_registry():
     with registry_lock:
         registry.clear()
         capability_index.clear()
+        last_heartbeat.clear()
     yield
     with registry_lock:
         registry.clear()
         capability_index.clear()
+        last_heartbeat.clear()
+    # Nothing from a test should reach the real store at exit
+    save_requested.clear()
+
+
+@pytest.fixture(scope="session")
+def store_dir(tmp_path_factory):
+    """One directory for every RegistryStore test file"""
+    return tmp_path_factory.mktemp('registry')
+
+
+@pytest.fixture
+def store_path(store_dir, request):
+    """A store file of this test's own inside the shared directory"""
+    return store_dir / f"{request.node.name}.json"
 
 
 class TestRegistryStore:
     """Test RegistryStore class"""
 
-    def test_registry_store_save_and_load(self):
+    @pytest.mark.parametrize('fmt', ['json', 'msgpack'])
+    def test_registry_store_save_and_load(self, store_path, fmt):
         """Test saving and loading registry data"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "test_registry.json"
-            store = RegistryStore(str(storage_path))
-
-            test_data = {
-                'service1': {
-                    'id': 'service1',
-                    'name': 'Test Service',
-                    'capabilities': ['cap1']
-                }
+        if fmt == 'msgpack':
+            pytest.importorskip('msgpack')
+
+        store = RegistryStore(str(store_path.with_suffix(f'.{fmt}')), fmt=fmt)
+
+        test_data = {
+            'service1': {
+                'id': 'service1',
+                'name': 'Test Service',
+                'version': '1.0.0',
+                'capabilities': ['cap1'],
+                'metadata': {}
             }
+        }
 
-            store.save(test_data)
-            loaded_data = store.load()
+        store.save(test_data)
+        loaded_data = store.load()
 
-            assert loaded_data == test_data
+        assert loaded_data == test_data
 
-    def test_registry_store_load_nonexistent(self):
+    def test_registry_store_omits_null_fields(self, store_path):
+        """Test null fields are left out of the file but restored on load"""
+        store = RegistryStore(str(store_path))
+
+        test_data = {
+            'service1': {
+                'id': 'service1',
+                'version': None,
+                'capabilities': ['cap1'],
+                'metadata': None
+            }
+        }
+
+        store.save(test_data)
+
+        assert b'null' not in store_path.read_bytes()
+        assert store.load() == test_data
+
+    def test_registry_store_load_nonexistent(self, store_path):
         """Test loading from non-existent file returns empty dict"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            storage_path = Path(tmpdir) / "nonexistent.json"
-            store = RegistryStore(str(storage_path))
+        store = RegistryStore(str(store_path))
+
+        loaded_data = store.load()
+        assert loaded_data == {}
+
+    def test_registration_is_saved_in_background(self, client, store_path):
+        """Test registering only flags a save, which save_registry performs"""
+        tmp_store = RegistryStore(str(store_path))
+        with patch('registry_service.store', tmp_store):
+            _post(client, '/api/register', {
+                'id': 'service1',
+                'name': 'Service 1',
+                'capabilities': ['cap1'],
+                'location': 'http://localhost:3001',
+                'mode': 'http'
+            })
 
-            loaded_data = store.load()
-            assert loaded_data == {}
+            assert save_requested.is_set()
+            assert tmp_store.load() == {}
+
+            save_registry()
+            assert tmp_store.load()['service1']['name'] == 'Service 1'
 
 
 class TestServiceRegistration:
@@ -82,12 +191,10 @@ class TestServiceRegistration:
             'mode': 'http'
         }
 
-        response = client.post('/api/register',
-                               data=json.dumps(service_data),
-                               content_type='application/json')
+        response = _post(client, '/api/register', service_data)
 
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['message'] == 'Service registered successfully'
         assert data['service_id'] == 'test-service'
 
@@ -106,42 +213,54 @@ class TestServiceRegistration:
             # Missing capabilities, location, mode
         }
 
+        response = _post(client, '/api/register', service_data)
+
+        assert response.status_code == 400
+        data = orjson.loads(response.data)
+        assert 'error' in data
+
+    def test_register_service_invalid_json(self, client):
+        """Test registration with a body that isn't JSON"""
         response = client.post('/api/register',
-                               data=json.dumps(service_data),
+                               data=b'{not json',
                                content_type='application/json')
 
         assert response.status_code == 400
-        data = json.loads(response.data)
-        assert 'error' in data
+        data = orjson.loads(response.data)
+        assert data['error'] == 'Invalid JSON payload'
 
     def test_register_multiple_services(self, client):
         """Test registering multiple services"""
-        services = [
-            {
-                'id': 'service1',
-                'name': 'Service 1',
-                'capabilities': ['cap1'],
-                'location': 'http://localhost:3001',
-                'mode': 'http'
-            },
-            {
-                'id': 'service2',
-                'name': 'Service 2',
-                'capabilities': ['cap2'],
-                'location': 'http://localhost:3002',
-                'mode': 'http'
-            }
-        ]
-
-        for service in services:
-            response = client.post('/api/register',
-                                   data=json.dumps(service),
-                                   content_type='application/json')
+        for payload in (SERVICE1_BYTES, SERVICE2_BYTES):
+            response = _post(client, '/api/register', payload)
             assert response.status_code == 201
 
         with registry_lock:
             assert len(registry) == 2
 
+    def test_register_bulk(self, client):
+        """Test registering several services in one request"""
+        response = _post(client, '/api/register_bulk', SERVICES_BYTES)
+
+        assert response.status_code == 201
+        data = orjson.loads(response.data)
+        assert data['registered'] == ['service1', 'service2']
+
+        with registry_lock:
+            assert set(registry) == {'service1', 'service2'}
+            assert list(capability_index['cap2']) == ['service2']
+
+    def test_register_bulk_rejects_invalid_entry(self, client):
+        """Test one invalid entry keeps the whole batch out"""
+        response = _post(client, '/api/register_bulk', [SERVICE1, {**SERVICE2, 'mode': 'ftp'}])
+
+        assert response.status_code == 400
+        data = orjson.loads(response.data)
+        assert data['error'].startswith('services[1]:')
+
+        with registry_lock:
+            assert len(registry) == 0
+
 
 class TestServiceUnregistration:
     """Test service unregistration endpoints"""
@@ -149,22 +268,13 @@ class TestServiceUnregistration:
     def test_unregister_service_success(self, client):
         """Test successful service unregistration"""
         # First register a service
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
+        _seed(TEST_SERVICE)
 
         # Then unregister it
         response = client.delete('/api/unregister/test-service')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['message'] == 'Service unregistered successfully'
 
         # Verify service is removed
@@ -177,7 +287,7 @@ class TestServiceUnregistration:
         response = client.delete('/api/unregister/nonexistent-service')
 
         assert response.status_code == 404
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert 'error' in data
 
 
@@ -189,55 +299,26 @@ class TestServiceListing:
         response = client.get('/api/services')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 0
         assert data['services'] == []
 
     def test_list_services(self, client):
         """Test listing registered services"""
         # Register two services
-        services = [
-            {
-                'id': 'service1',
-                'name': 'Service 1',
-                'capabilities': ['cap1'],
-                'location': 'http://localhost:3001',
-                'mode': 'http'
-            },
-            {
-                'id': 'service2',
-                'name': 'Service 2',
-                'capabilities': ['cap2'],
-                'location': 'http://localhost:3002',
-                'mode': 'http'
-            }
-        ]
-
-        for service in services:
-            client.post('/api/register',
-                        data=json.dumps(service),
-                        content_type='application/json')
+        _post(client, '/api/register_bulk', SERVICES_BYTES)
 
         response = client.get('/api/services')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 2
         assert len(data['services']) == 2
 
     def test_list_services_with_status_filter(self, client):
         """Test listing services with status filter"""
         # Register a service
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
+        _seed(TEST_SERVICE)
 
         # Mark as inactive
         with registry_lock:
@@ -245,31 +326,79 @@ class TestServiceListing:
 
         response = client.get('/api/services?status=active')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 0
 
         response = client.get('/api/services?status=inactive')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 1
 
+    def test_list_services_cached_until_registry_changes(self, client):
+        """Test the list body is rebuilt only after a write"""
+        _post(client, '/api/register', {
+            'id': 'service1',
+            'name': 'Service 1',
+            'capabilities': ['cap1'],
+            'location': 'http://localhost:3001',
+            'mode': 'http'
+        })
+
+        with patch('registry_service._services_payload',
+                   wraps=registry_service._services_payload) as build:
+            first = client.get('/api/services')
+            second = client.get('/api/services')
+            assert build.call_count == 1
+            assert first.data == second.data
+
+            # A heartbeat from an active service only moves last_seen
+            client.post('/api/heartbeat/service1')
+            client.get('/api/services')
+            assert build.call_count == 1
+
+            _post(client, '/api/register', SERVICE2_BYTES)
+            client.get('/api/services')
+            assert build.call_count == 2
+
+    def test_list_services_not_modified(self, client):
+        """Test a client holding the current ETag gets 304 until a write"""
+        _post(client, '/api/register', {
+            'id': 'service1',
+            'name': 'Service 1',
+            'capabilities': ['cap1'],
+            'location': 'http://localhost:3001',
+            'mode': 'http'
+        })
+
+        response = client.get('/api/services')
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+
+        response = client.get('/api/services', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+        # Other filters are different representations
+        response = client.get('/api/services?status=active', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+        client.post('/api/heartbeat/service1')
+        response = client.get('/api/services', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        client.delete('/api/unregister/service1')
+        response = client.get('/api/services', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
     def test_get_service_by_id(self, client):
         """Test getting a specific service by ID"""
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
+        _seed(TEST_SERVICE)
 
         response = client.get('/api/services/test-service')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['id'] == 'test-service'
         assert data['name'] == 'Test Service'
 
@@ -278,7 +407,7 @@ class TestServiceListing:
         response = client.get('/api/services/nonexistent')
 
         assert response.status_code == 404
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert 'error' in data
 
 
@@ -290,7 +419,7 @@ class TestCapabilities:
         response = client.get('/api/capabilities')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 0
         assert data['capabilities'] == []
 
@@ -313,65 +442,49 @@ class TestCapabilities:
             }
         ]
 
-        for service in services:
-            client.post('/api/register',
-                        data=json.dumps(service),
-                        content_type='application/json')
+        _post(client, '/api/register_bulk', services)
 
         response = client.get('/api/capabilities')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 3  # cap1, cap2, cap3
 
     def test_get_capability_success(self, client):
         """Test getting a service by capability"""
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
+        _seed(TEST_SERVICE)
 
         response = client.get('/api/capabilities/test-cap')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['id'] == 'test-service'
 
+    def test_get_capability_prefers_first_registered(self, client):
+        """Test the first active provider to register is the one returned"""
+        for i in range(5):
+            _seed({**TEST_SERVICE, 'id': f'provider-{i}'}, status='inactive' if i == 0 else 'active')
+
+        response = client.get('/api/capabilities/test-cap')
+
+        assert orjson.loads(response.data)['id'] == 'provider-1'
+
     def test_get_capability_not_found(self, client):
         """Test getting a non-existent capability"""
         response = client.get('/api/capabilities/nonexistent-cap')
 
         assert response.status_code == 404
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert 'error' in data
 
     def test_get_capability_no_active_services(self, client):
         """Test getting a capability when no active services provide it"""
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
-
-        # Mark service as inactive
-        with registry_lock:
-            registry['test-service']['status'] = 'inactive'
+        _seed(TEST_SERVICE, status='inactive')
 
         response = client.get('/api/capabilities/test-cap')
 
         assert response.status_code == 503
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert 'error' in data
 
 
@@ -380,26 +493,13 @@ class TestHeartbeat:
 
     def test_heartbeat_success(self, client):
         """Test sending heartbeat for a service"""
-        service_data = {
-            'id': 'test-service',
-            'name': 'Test Service',
-            'capabilities': ['test-cap'],
-            'location': 'http://localhost:3000',
-            'mode': 'http'
-        }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
-
-        # Mark as inactive first
-        with registry_lock:
-            registry['test-service']['status'] = 'inactive'
-            registry['test-service']['failed_checks'] = 5
+        # Start out inactive
+        _seed(TEST_SERVICE, status='inactive', failed_checks=5)
 
         response = client.post('/api/heartbeat/test-service')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['message'] == 'Heartbeat received'
 
         # Verify status is updated
@@ -412,7 +512,7 @@ class TestHeartbeat:
         response = client.post('/api/heartbeat/nonexistent')
 
         assert response.status_code == 404
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert 'error' in data
 
 
@@ -424,7 +524,7 @@ class TestStats:
         response = client.get('/api/stats')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['total_services'] == 0
         assert data['active_services'] == 0
         assert data['inactive_services'] == 0
@@ -451,19 +551,14 @@ class TestStats:
             }
         ]
 
-        for service in services:
-            client.post('/api/register',
-                        data=json.dumps(service),
-                        content_type='application/json')
-
-        # Mark one as inactive
-        with registry_lock:
-            registry['service2']['status'] = 'inactive'
+        # One active, one inactive
+        _seed(services[0])
+        _seed(services[1], status='inactive')
 
         response = client.get('/api/stats')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['total_services'] == 2
         assert data['active_services'] == 1
         assert data['inactive_services'] == 1
@@ -477,72 +572,34 @@ class TestServiceDiscovery:
 
     def test_discover_services_by_required_capabilities(self, client):
         """Test discovering services by required capabilities"""
-        services = [
-            {
-                'id': 'service1',
-                'name': 'Service 1',
-                'capabilities': ['cap1', 'cap2', 'cap3'],
-                'location': 'http://localhost:3001',
-                'mode': 'http'
-            },
-            {
-                'id': 'service2',
-                'name': 'Service 2',
-                'capabilities': ['cap1', 'cap2'],
-                'location': 'http://localhost:3002',
-                'mode': 'http'
-            },
-            {
-                'id': 'service3',
-                'name': 'Service 3',
-                'capabilities': ['cap1'],
-                'location': 'http://localhost:3003',
-                'mode': 'http'
-            }
-        ]
-
-        for service in services:
-            client.post('/api/register',
-                        data=json.dumps(service),
-                        content_type='application/json')
+        _post(client, '/api/register_bulk', [DISCOVER_SERVICE1, DISCOVER_SERVICE2, {
+            'id': 'service3',
+            'name': 'Service 3',
+            'capabilities': ['cap1'],
+            'location': 'http://localhost:3003',
+            'mode': 'http'
+        }])
 
         # Discover services with required capabilities
-        discovery_request = {
-            'capabilities': ['cap1', 'cap2']
-        }
-
-        response = client.post('/api/discover',
-                               data=json.dumps(discovery_request),
-                               content_type='application/json')
+        response = _post(client, '/api/discover', DISCOVER_CAP12_BYTES)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 2  # service1 and service2
         assert len(data['matches']) == 2
 
+    def test_discover_ties_keep_registration_order(self, client):
+        """Test equally scored matches come back in the order they registered"""
+        _post(client, '/api/register_bulk', [DISCOVER_SERVICE2, DISCOVER_SERVICE1])
+
+        response = _post(client, '/api/discover', DISCOVER_CAP12_BYTES)
+
+        data = orjson.loads(response.data)
+        assert [m['service']['id'] for m in data['matches']] == ['service2', 'service1']
+
     def test_discover_services_with_optional_capabilities(self, client):
         """Test discovering services with optional capabilities"""
-        services = [
-            {
-                'id': 'service1',
-                'name': 'Service 1',
-                'capabilities': ['cap1', 'cap2', 'cap3'],
-                'location': 'http://localhost:3001',
-                'mode': 'http'
-            },
-            {
-                'id': 'service2',
-                'name': 'Service 2',
-                'capabilities': ['cap1', 'cap2'],
-                'location': 'http://localhost:3002',
-                'mode': 'http'
-            }
-        ]
-
-        for service in services:
-            client.post('/api/register',
-                        data=json.dumps(service),
-                        content_type='application/json')
+        _post(client, '/api/register_bulk', DISCOVER_SERVICES_BYTES)
 
         # Discover with optional capabilities
         discovery_request = {
@@ -550,12 +607,10 @@ class TestServiceDiscovery:
             'optional': ['cap3']
         }
 
-        response = client.post('/api/discover',
-                               data=json.dumps(discovery_request),
-                               content_type='application/json')
+        response = _post(client, '/api/discover', discovery_request)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 2
         # service1 should have higher match score
         assert data['matches'][0]['service']['id'] == 'service1'
@@ -569,20 +624,16 @@ class TestServiceDiscovery:
             'location': 'http://localhost:3001',
             'mode': 'http'
         }
-        client.post('/api/register',
-                    data=json.dumps(service_data),
-                    content_type='application/json')
+        _post(client, '/api/register', service_data)
 
         discovery_request = {
             'capabilities': ['nonexistent-cap']
         }
 
-        response = client.post('/api/discover',
-                               data=json.dumps(discovery_request),
-                               content_type='application/json')
+        response = _post(client, '/api/discover', discovery_request)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['count'] == 0
 
 
@@ -594,12 +645,74 @@ class TestHealthCheck:
         response = client.get('/health')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         assert data['status'] == 'healthy'
         assert data['service'] == 'modularity-registry'
         assert 'timestamp' in data
 
 
+class TestHealthChecks:
+    """Test the background health checks"""
+
+    def test_run_health_checks(self):
+        """Test probes only reach HTTP services and update their status"""
+        with registry_lock:
+            registry['up'] = {
+                'id': 'up', 'mode': 'http', 'location': 'http://localhost:3001',
+                'status': 'inactive', 'failed_checks': 2, 'last_seen': 'never'
+            }
+            registry['down'] = {
+                'id': 'down', 'mode': 'http', 'location': 'http://localhost:3002',
+                'status': 'active', 'failed_checks': MAX_FAILED_CHECKS - 1, 'last_seen': 'never'
+            }
+            registry['embedded'] = {
+                'id': 'embedded', 'mode': 'embedded', 'location': 'http://localhost:3003',
+                'status': 'active', 'failed_checks': 0, 'last_seen': 'never'
+            }
+            registry['external'] = {
+                'id': 'external', 'mode': 'http', 'location': 'http://example.com',
+                'status': 'active', 'failed_checks': 0, 'last_seen': 'never'
+            }
+
+        def fake_get(url, timeout):
+            if url.startswith('http://localhost:3002'):
+                raise requests.ConnectionError()
+            return Mock(status_code=200)
+
+        with patch('registry_service.http_session.get', side_effect=fake_get) as mock_get:
+            run_health_checks()
+
+        # Embedded services and non-private URLs are never probed
+        assert sorted(call.args[0] for call in mock_get.call_args_list) == [
+            'http://localhost:3001/_module/health',
+            'http://localhost:3002/_module/health'
+        ]
+        with registry_lock:
+            assert registry['up']['status'] == 'active'
+            assert registry['up']['failed_checks'] == 0
+            assert registry['up']['last_seen'] != 'never'
+            assert registry['down']['status'] == 'inactive'
+            assert registry['down']['failed_checks'] == MAX_FAILED_CHECKS
+            assert registry['embedded']['last_seen'] == 'never'
+            assert registry['external']['status'] == 'active'
+
+    def test_recent_heartbeat_skips_probe(self, client):
+        """Test a service that just sent a heartbeat is not probed"""
+        _post(client, '/api/register', {
+            'id': 'service1',
+            'name': 'Service 1',
+            'capabilities': ['cap1'],
+            'location': 'http://localhost:3001',
+            'mode': 'http'
+        })
+        client.post('/api/heartbeat/service1')
+
+        with patch('registry_service.http_session.get') as mock_get:
+            run_health_checks()
+
+        mock_get.assert_not_called()
+
+
 class TestUtilityFunctions:
     """Test utility functions"""
 
@@ -621,9 +734,58 @@ class TestUtilityFunctions:
             assert 'cap1' in capability_index
             assert 'cap2' in capability_index
             assert 'cap3' in capability_index
-            assert capability_index['cap1'] == ['service1']
-            assert set(capability_index['cap2']) == {'service1', 'service2'}
-            assert capability_index['cap3'] == ['service2']
+            assert list(capability_index['cap1']) == ['service1']
+            assert list(capability_index['cap2']) == ['service1', 'service2']
+            assert list(capability_index['cap3']) == ['service2']
+
+    def test_response_cache_evicts_lru_and_expired(self):
+        """Test the response cache stays bounded and drops expired entries"""
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        cache.get('a')  # 'b' is now the least recently used
+        cache.put('c', b'3')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == b'1'
+        assert cache.get('c') == b'3'
+
+        expired = ResponseCache(ttl=0)
+        expired.put('a', b'1')
+        assert expired.get('a') is None
+
+    def test_rwlock_readers_share_writers_exclude(self):
+        """Test readers hold the lock together while a writer waits for them"""
+        lock = RWLock()
+        reading = threading.Event()
+        finish_reading = threading.Event()
+        written = threading.Event()
+
+        def reader():
+            with lock.read():
+                reading.set()
+                finish_reading.wait(5)
+
+        def writer():
+            with lock:
+                written.set()
+
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        assert reading.wait(5)
+
+        # A second reader gets in while the first still holds the lock
+        with lock.read():
+            pass
+
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        assert not written.wait(0.1)
+
+        finish_reading.set()
+        reader_thread.join(5)
+        writer_thread.join(5)
+        assert written.is_set()
 
 
 if __name__ == '__main__':
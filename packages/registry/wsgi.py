@@ -0,0 +1,15 @@
+"""
+WSGI entry point for running the registry under a production server
+
+    gunicorn -w 1 -k gthread --threads 8 -b 127.0.0.1:5000 wsgi:application
+
+Keep a single worker process: the registry lives in process memory, so every
+extra worker would hold its own divergent copy. Threads share it safely
+behind registry_lock.
+"""
+
+from registry_service import app, init_registry
+
+init_registry()
+
+application = app
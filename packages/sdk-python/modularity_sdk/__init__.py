@@ -3,21 +3,68 @@ Modularity SDK - Python Implementation
 Allows apps to run standalone or as modules within larger applications
 """
 
+import functools
+import gzip
+import hashlib
 import json
 import os
 import socket
 import requests
+from requests.adapters import HTTPAdapter
 import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from pathlib import Path
 import time
 from dataclasses import dataclass
+from collections import OrderedDict
+import atexit
+
+try:
+    import orjson  # optional: pip install modularity-sdk[orjson]
+except ImportError:
+    orjson = None
+
+# JSON codec for wire payloads and manifests: orjson when available, stdlib otherwise.
+# Both produce compact UTF-8 bytes and accept bytes or str.
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+    _loads = json.loads
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# run_standalone gzips JSON responses at least this large; smaller ones aren't worth it
+_GZIP_MIN_SIZE = 1024
+
+# Module classes loaded by _load_module_instance, keyed by
+# (entry file, its mtime_ns, class name) so an edited file is loaded afresh
+_MODULE_CLASS_CACHE: Dict[Tuple[str, int, str], type] = {}
+
+
+def _create_http_session() -> requests.Session:
+    """Session shared by every SDK HTTP call, so connections are kept alive and reused"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_SESSION = _create_http_session()
+atexit.register(_SESSION.close)
 
 
 @dataclass
 class ServiceInfo:
     """Information about a registered service"""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ('id', 'location', 'mode', 'capabilities', 'status')
+
     id: str
     location: str
     mode: str  # 'http', 'ipc', 'direct'
@@ -54,83 +101,147 @@ class ModuleInterface(ABC):
         pass
 
 
+# Constant parts of the newline-terminated JSON-RPC request sent over IPC;
+# only the params object between them is encoded per call
+_IPC_PREFIX = b'{"jsonrpc":"2.0","method":"invoke","id":1,"params":'
+_IPC_SUFFIX = b'}\n'
+
+
 class ServiceProxy:
     """Proxy for invoking remote services"""
 
+    __slots__ = ('service_info',)
+
     def __init__(self, service_info: ServiceInfo):
         self.service_info = service_info
 
     def invoke(self, capability: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Invoke a capability on the remote service"""
-        if self.service_info.mode == 'http':
-            return self._invoke_http(capability, params)
-        elif self.service_info.mode == 'ipc':
-            return self._invoke_ipc(capability, params)
-        else:
+        handler = self._DISPATCH.get(self.service_info.mode)
+        if handler is None:
             raise ValueError(f"Unsupported mode: {self.service_info.mode}")
 
+        # Looked up by name so subclass overrides and patches are honoured
+        return getattr(self, handler)(capability, params)
+
     def _invoke_http(self, capability: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Invoke via HTTP"""
         url = f"{self.service_info.location}/_module/invoke"
-        response = requests.post(url, json={
+        response = _SESSION.post(url, data=_dumps({
             'capability': capability,
             'params': params
-        }, timeout=30)
+        }), headers=_JSON_HEADERS, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
     def _invoke_ipc(self, capability: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Invoke via IPC socket"""
         sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         try:
             sock.connect(self.service_info.location)
-            message = json.dumps({
-                'jsonrpc': '2.0',
-                'method': 'invoke',
-                'params': {
-                    'capability': capability,
-                    'params': params
-                },
-                'id': 1
+            body = _dumps({
+                'capability': capability,
+                'params': params
             })
-            sock.sendall(message.encode() + b'\n')
-            response = b''
+            # Gather-write envelope and params in one syscall without joining them
+            parts = (_IPC_PREFIX, body, _IPC_SUFFIX)
+            sent = sock.sendmsg(parts)
+            if sent < len(_IPC_PREFIX) + len(body) + len(_IPC_SUFFIX):
+                # Partial write (large params): send the rest the ordinary way
+                sock.sendall(b''.join(parts)[sent:])
+            # Replies are newline-terminated; grow one buffer in place rather
+            # than re-copying an ever larger bytes object on every chunk
+            response = bytearray()
             while True:
-                chunk = sock.recv(4096)
+                chunk = sock.recv(65536)
                 if not chunk:
                     break
                 response += chunk
                 if b'\n' in chunk:
                     break
-            return json.loads(response.decode())['result']
+            return _loads(response)['result']
         finally:
             sock.close()
 
+    # Service mode -> transport method name; add an entry here to support a new mode
+    _DISPATCH = {'http': '_invoke_http', 'ipc': '_invoke_ipc'}
+
 
 class ServiceLocator:
-    """Finds and connects to services providing specific capabilities"""
+    """Finds and connects to services providing specific capabilities
+
+    Lookups are cached for ttl seconds. After that, until max_stale, the cached
+    service is still returned at once while a background refresh fetches a new
+    one, so callers only wait on the registry for unknown or very old entries.
+    At most max_entries capabilities are kept; the least recently used go first.
+    """
 
-    def __init__(self, registry_url: str = "http://localhost:5000"):
+    def __init__(self, registry_url: str = "http://localhost:5000",
+                 ttl: float = 60, max_stale: float = 600, max_entries: int = 1024):
         self.registry_url = registry_url
-        self._cache = {}
-        self._cache_ttl = 60  # Cache for 60 seconds
-        self._cache_time = {}
+        # capability -> (proxy, fetched_at), least recently used first
+        self._cache: OrderedDict[str, Tuple[ServiceProxy, float]] = OrderedDict()
+        self._cache_ttl = ttl
+        self._cache_max_stale = max_stale
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._refreshing = set()  # capabilities with a background refresh in flight
+        self._inflight: Dict[str, Future] = {}  # capability -> registry lookup in progress
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='locator-refresh'
+        )
 
     def get_capability(self, capability_name: str) -> ServiceProxy:
         """Find a service providing the specified capability"""
         # Check cache first
-        if capability_name in self._cache:
-            if time.time() - self._cache_time[capability_name] < self._cache_ttl:
-                return self._cache[capability_name]
+        with self._lock:
+            entry = self._cache.get(capability_name)
+            if entry is not None:
+                self._cache.move_to_end(capability_name)
+
+        if entry is not None:
+            proxy, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self._cache_ttl:
+                return proxy
+            if age < self._cache_max_stale:
+                # Stale: answer now, refresh for the next caller
+                self._refresh_in_background(capability_name)
+                return proxy
+
+        return self._fetch_once(capability_name)
+
+    def _fetch_once(self, capability_name: str) -> ServiceProxy:
+        """Fetch a capability, sharing one registry request among concurrent callers"""
+        with self._lock:
+            future = self._inflight.get(capability_name)
+            leader = future is None
+            if leader:
+                future = self._inflight[capability_name] = Future()
+
+        if not leader:
+            # Another thread is already asking the registry; take its answer (or error)
+            return future.result()
 
-        # Query registry
         try:
-            response = requests.get(
+            future.set_result(self._fetch(capability_name))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[capability_name]
+
+        return future.result()
+
+    def _fetch(self, capability_name: str) -> ServiceProxy:
+        """Query the registry for a capability and cache the result"""
+        try:
+            response = _SESSION.get(
                 f"{self.registry_url}/api/capabilities/{capability_name}",
                 timeout=5
             )
             response.raise_for_status()
-            service_data = response.json()
+            service_data = _loads(response.content)
 
             service_info = ServiceInfo(
                 id=service_data['id'],
@@ -141,49 +252,103 @@ class ServiceLocator:
             )
 
             proxy = ServiceProxy(service_info)
-            self._cache[capability_name] = proxy
-            self._cache_time[capability_name] = time.time()
+            with self._lock:
+                self._cache[capability_name] = (proxy, time.time())
+                self._cache.move_to_end(capability_name)
+                if len(self._cache) > self._max_entries:
+                    self._cache.popitem(last=False)
 
             return proxy
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
+            # ValueError: the registry answered with a body that isn't JSON
             raise RuntimeError(f"Failed to locate capability '{capability_name}': {e}")
 
+    def _refresh_in_background(self, capability_name: str):
+        """Start a refresh of a stale entry unless one is already running"""
+        with self._lock:
+            if capability_name in self._refreshing:
+                return
+            self._refreshing.add(capability_name)
+        try:
+            self._refresh_executor.submit(self._refresh, capability_name)
+        except RuntimeError:  # the locator has been closed
+            with self._lock:
+                self._refreshing.discard(capability_name)
+
+    def _refresh(self, capability_name: str):
+        """Background half of _refresh_in_background"""
+        try:
+            self._fetch_once(capability_name)
+        except RuntimeError as e:
+            # Keep serving the stale entry until it passes max_stale
+            print(f"Warning: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(capability_name)
+
     def clear_cache(self):
         """Clear the service cache"""
-        self._cache.clear()
-        self._cache_time.clear()
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        """Stop background refreshes; stale entries are then served until max_stale"""
+        self._refresh_executor.shutdown(wait=False)
 
 
 class EventBus:
     """Simple in-memory event bus (can be extended to use Redis/NATS)"""
 
-    def __init__(self):
-        self._subscribers: Dict[str, List[Callable]] = {}
+    def __init__(self, max_workers: Optional[int] = None):
+        # event -> handlers, as an insertion-ordered dict used as a set. Each
+        # dict is replaced, never mutated, once published here, so publish can
+        # read it without the lock; _lock only serializes subscribe/unsubscribe
+        self._subscribers: Dict[str, Dict[Callable, None]] = {}
         self._lock = threading.Lock()
+        # Handlers run on a shared pool instead of a new thread per delivery
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4),
+            thread_name_prefix='event-bus'
+        )
 
     def publish(self, event_name: str, data: Dict[str, Any]):
         """Publish an event"""
-        with self._lock:
-            subscribers = self._subscribers.get(event_name, [])
-
-        for handler in subscribers:
+        for handler in self._subscribers.get(event_name, {}):
             try:
-                threading.Thread(target=handler, args=(data,)).start()
-            except Exception as e:
+                self._executor.submit(self._safe_call, event_name, handler, data)
+            except RuntimeError as e:  # the bus has been closed
                 print(f"Error handling event {event_name}: {e}")
 
+    @staticmethod
+    def _safe_call(event_name: str, handler: Callable, data: Dict[str, Any]):
+        """Run one handler, reporting (not propagating) its errors"""
+        try:
+            handler(data)
+        except Exception as e:
+            print(f"Error handling event {event_name}: {e}")
+
+    def close(self):
+        """Stop accepting events; handlers already queued still run"""
+        self._executor.shutdown(wait=False)
+
     def subscribe(self, event_name: str, handler: Callable):
-        """Subscribe to an event"""
+        """Subscribe to an event (subscribing a handler twice has no extra effect)"""
         with self._lock:
-            if event_name not in self._subscribers:
-                self._subscribers[event_name] = []
-            self._subscribers[event_name].append(handler)
+            handlers = self._subscribers.get(event_name, {})
+            if handler not in handlers:
+                self._subscribers[event_name] = {**handlers, handler: None}
 
     def unsubscribe(self, event_name: str, handler: Callable):
-        """Unsubscribe from an event"""
+        """Unsubscribe from an event (a handler that isn't subscribed is ignored)"""
         with self._lock:
-            if event_name in self._subscribers:
-                self._subscribers[event_name].remove(handler)
+            handlers = self._subscribers.get(event_name, {})
+            if handler in handlers:
+                remaining = dict(handlers)
+                del remaining[handler]
+                if remaining:
+                    self._subscribers[event_name] = remaining
+                else:
+                    del self._subscribers[event_name]
 
 
 class ModularitySDK:
@@ -193,21 +358,36 @@ class ModularitySDK:
                  registry_url: str = "http://localhost:5000"):
         self.manifest_path = Path(manifest_path)
         self.manifest = self._load_manifest()
+        self._env_prefix = f"{self.manifest['id'].upper().replace('-', '_')}_"
         self.registry_url = registry_url
+        self._register_url = f"{registry_url}/api/register"
         self.locator = ServiceLocator(registry_url)
         self.event_bus = EventBus()
         self.config = self._load_config()
         self._http_server = None
         self._ipc_server = None
         self._module_instance = None
+        # Fans out invoke_capabilities; threads start on first use
+        self._invoke_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='invoke')
+
+    def close(self):
+        """Shut down the SDK's thread pools (invoke fan-out, cache refresh, events)"""
+        self._invoke_executor.shutdown(wait=False)
+        self.locator.close()
+        self.event_bus.close()
+
+    def __enter__(self) -> 'ModularitySDK':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _load_manifest(self) -> Dict[str, Any]:
         """Load the application manifest"""
         if not self.manifest_path.exists():
             raise FileNotFoundError(f"Manifest not found: {self.manifest_path}")
 
-        with open(self.manifest_path) as f:
-            return json.load(f)
+        return _loads(self.manifest_path.read_bytes())
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration with cascade (defaults → env → file → runtime)"""
@@ -217,21 +397,20 @@ class ModularitySDK:
         if 'config' in self.manifest and 'defaults' in self.manifest['config']:
             defaults_path = self.manifest_path.parent / self.manifest['config']['defaults']
             if defaults_path.exists():
-                with open(defaults_path) as f:
-                    config.update(json.load(f))
+                config.update(_loads(defaults_path.read_bytes()))
 
         # 2. Load from environment variables
-        prefix = f"{self.manifest['id'].upper().replace('-', '_')}_"
-        for key, value in os.environ.items():
-            if key.startswith(prefix):
-                config_key = key[len(prefix):].lower()
-                config[config_key] = value
+        prefix = self._env_prefix
+        plen = len(prefix)
+        config.update({
+            key[plen:].lower(): value
+            for key, value in os.environ.items() if key.startswith(prefix)
+        })
 
         # 3. Load from config file
         config_file = Path.home() / '.ecosystem' / f"{self.manifest['id']}.json"
         if config_file.exists():
-            with open(config_file) as f:
-                config.update(json.load(f))
+            config.update(_loads(config_file.read_bytes()))
 
         return config
 
@@ -268,6 +447,20 @@ class ModularitySDK:
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @app.after_request
+        def compress(response):
+            # Gzip large JSON bodies for clients that accept it (requests does by default)
+            if (response.mimetype == 'application/json'
+                    and not response.direct_passthrough
+                    and 'Content-Encoding' not in response.headers
+                    and request.accept_encodings['gzip']):
+                body = response.get_data()
+                if len(body) >= _GZIP_MIN_SIZE:
+                    response.set_data(gzip.compress(body, compresslevel=1))
+                    response.headers['Content-Encoding'] = 'gzip'
+                    response.vary.add('Accept-Encoding')
+            return response
+
         # Register with registry
         self._register_with_registry()
 
@@ -293,16 +486,21 @@ class ModularitySDK:
             raise ValueError("Module interface not defined in manifest")
 
         module_config = self.manifest['interfaces']['module']
-        entry_file = self.manifest_path.parent / module_config['entry']
+        entry_file = (self.manifest_path.parent / module_config['entry']).resolve()
         class_name = module_config['class']
 
-        # Dynamic import
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("module", entry_file)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        key = (str(entry_file), entry_file.stat().st_mtime_ns, class_name)
+        module_class = _MODULE_CLASS_CACHE.get(key)
+        if module_class is None:
+            # Dynamic import, under a name unique to the entry file
+            import importlib.util
+            module_name = f"modularity_module_{hashlib.sha1(key[0].encode()).hexdigest()[:12]}"
+            spec = importlib.util.spec_from_file_location(module_name, entry_file)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            module_class = _MODULE_CLASS_CACHE[key] = getattr(module, class_name)
 
-        module_class = getattr(module, class_name)
         return module_class()
 
     def invoke_capability(self, capability: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -310,6 +508,15 @@ class ModularitySDK:
         service = self.locator.get_capability(capability)
         return service.invoke(capability, params)
 
+    def invoke_capabilities(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Invoke several capabilities concurrently; results come back in the order of calls
+
+        Each call is a (capability, params) pair. The first failure is raised.
+        """
+        if len(calls) <= 1:
+            return [self.invoke_capability(capability, params) for capability, params in calls]
+        return list(self._invoke_executor.map(lambda call: self.invoke_capability(*call), calls))
+
     def publish_event(self, event_name: str, data: Dict[str, Any]):
         """Publish an event to the ecosystem"""
         self.event_bus.publish(event_name, data)
@@ -318,21 +525,25 @@ class ModularitySDK:
         """Subscribe to an ecosystem event"""
         self.event_bus.subscribe(event_name, handler)
 
-    def _register_with_registry(self):
-        """Register this service with the ecosystem registry"""
-        registration_data = {
+    @functools.cached_property
+    def _registration_body(self) -> bytes:
+        """Encoded registration payload; built from the manifest on first use"""
+        return _dumps({
             'id': self.manifest['id'],
             'name': self.manifest['name'],
             'version': self.manifest['version'],
             'capabilities': self.manifest['provides']['capabilities'],
             'location': f"http://localhost:{self.manifest['interfaces']['http']['port']}",
             'mode': 'http'
-        }
+        })
 
+    def _register_with_registry(self):
+        """Register this service with the ecosystem registry"""
         try:
-            response = requests.post(
-                f"{self.registry_url}/api/register",
-                json=registration_data,
+            response = _SESSION.post(
+                self._register_url,
+                data=self._registration_body,
+                headers=_JSON_HEADERS,
                 timeout=5
             )
             response.raise_for_status()
@@ -343,11 +554,16 @@ class ModularitySDK:
     def load_local_module(self, module_path: str, config: Optional[Dict] = None) -> ModuleInterface:
         """Load another module from the local filesystem"""
         module_manifest_path = Path(module_path) / "app.manifest.json"
-        module_sdk = ModularitySDK(str(module_manifest_path), self.registry_url)
-        return module_sdk.load_as_module(config or {})
+        with ModularitySDK(str(module_manifest_path), self.registry_url) as module_sdk:
+            return module_sdk.load_as_module(config or {})
 
 
 # Utility functions
+def clear_module_cache():
+    """Forget loaded module classes, so the next load re-executes their entry files"""
+    _MODULE_CLASS_CACHE.clear()
+
+
 def create_manifest_template(app_id: str, app_name: str, runtime: str) -> Dict[str, Any]:
     """Create a template manifest for a new application"""
     return {
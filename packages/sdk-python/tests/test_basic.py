@@ -3,8 +3,10 @@ Basic tests for the Modularity SDK
 """
 
 import pytest
+import gzip
 import json
 import tempfile
+import threading
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 from modularity_sdk import (
@@ -14,6 +16,7 @@ from modularity_sdk import (
     ServiceLocator,
     EventBus,
     ModularitySDK,
+    clear_module_cache,
     create_manifest_template
 )
 
@@ -46,6 +49,19 @@ class TestServiceInfo:
         assert service.capabilities == ["cap1", "cap2"]
         assert service.status == "healthy"
 
+    def test_service_info_has_no_instance_dict(self):
+        """Test ServiceInfo and ServiceProxy use slots instead of a per-instance dict"""
+        service = ServiceInfo(
+            id="test-service",
+            location="http://localhost:3000",
+            mode="http",
+            capabilities=["cap1"],
+            status="healthy"
+        )
+
+        assert not hasattr(service, '__dict__')
+        assert not hasattr(ServiceProxy(service), '__dict__')
+
 
 class TestServiceProxy:
     """Test ServiceProxy class"""
@@ -62,11 +78,11 @@ class TestServiceProxy:
         proxy = ServiceProxy(service_info)
         assert proxy.service_info == service_info
 
-    @patch('modularity_sdk.requests.post')
+    @patch('modularity_sdk._SESSION.post')
     def test_invoke_http(self, mock_post):
         """Test HTTP invocation"""
         mock_response = Mock()
-        mock_response.json.return_value = {"result": "success"}
+        mock_response.content = json.dumps({"result": "success"}).encode()
         mock_post.return_value = mock_response
 
         service_info = ServiceInfo(
@@ -82,6 +98,49 @@ class TestServiceProxy:
         assert result == {"result": "success"}
         mock_post.assert_called_once()
 
+    def test_invoke_ipc(self):
+        """Test IPC invocation with a request and reply spanning many reads and writes"""
+        import socket
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sock_path = str(Path(tmpdir) / "service.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(sock_path)
+            server.listen(1)
+            requests_seen = []
+
+            def serve():
+                conn, _ = server.accept()
+                with conn:
+                    request = bytearray()
+                    while not request.endswith(b'\n'):
+                        request += conn.recv(65536)
+                    requests_seen.append(json.loads(request))
+                    reply = {'jsonrpc': '2.0', 'result': {'data': 'x' * 200000}, 'id': 1}
+                    conn.sendall(json.dumps(reply).encode() + b'\n')
+
+            thread = threading.Thread(target=serve)
+            thread.start()
+
+            service_info = ServiceInfo(
+                id="test",
+                location=sock_path,
+                mode="ipc",
+                capabilities=["test-cap"],
+                status="healthy"
+            )
+            proxy = ServiceProxy(service_info)
+            # Large enough to span many socket buffers on both ends
+            params = {"param": "value", "blob": "y" * 1000000}
+            result = proxy.invoke("test-cap", params)
+
+            thread.join()
+            server.close()
+
+        assert result == {'data': 'x' * 200000}
+        assert requests_seen[0]['method'] == 'invoke'
+        assert requests_seen[0]['params'] == {'capability': 'test-cap', 'params': params}
+
     def test_invoke_unsupported_mode(self):
         """Test invoking with unsupported mode raises error"""
         service_info = ServiceInfo(
@@ -96,6 +155,25 @@ class TestServiceProxy:
         with pytest.raises(ValueError, match="Unsupported mode"):
             proxy.invoke("test-cap", {})
 
+    def test_invoke_uses_overridden_transport(self):
+        """Test invoke dispatches to a subclass's transport method"""
+        class RecordingProxy(ServiceProxy):
+            __slots__ = ()
+
+            def _invoke_http(self, capability, params):
+                return {'capability': capability, 'params': params}
+
+        service_info = ServiceInfo(
+            id="test",
+            location="http://localhost:3000",
+            mode="http",
+            capabilities=["test-cap"],
+            status="healthy"
+        )
+        proxy = RecordingProxy(service_info)
+
+        assert proxy.invoke("test-cap", {"a": 1}) == {'capability': 'test-cap', 'params': {"a": 1}}
+
 
 class TestServiceLocator:
     """Test ServiceLocator class"""
@@ -105,17 +183,17 @@ class TestServiceLocator:
         locator = ServiceLocator("http://localhost:5000")
         assert locator.registry_url == "http://localhost:5000"
 
-    @patch('modularity_sdk.requests.get')
+    @patch('modularity_sdk._SESSION.get')
     def test_get_capability(self, mock_get):
         """Test finding a service by capability"""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             'id': 'test-service',
             'location': 'http://localhost:3000',
             'mode': 'http',
             'capabilities': ['test-cap'],
             'status': 'healthy'
-        }
+        }).encode()
         mock_get.return_value = mock_response
 
         locator = ServiceLocator()
@@ -124,17 +202,17 @@ class TestServiceLocator:
         assert isinstance(proxy, ServiceProxy)
         assert proxy.service_info.id == 'test-service'
 
-    @patch('modularity_sdk.requests.get')
+    @patch('modularity_sdk._SESSION.get')
     def test_get_capability_uses_cache(self, mock_get):
         """Test that service locator caches results"""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             'id': 'test-service',
             'location': 'http://localhost:3000',
             'mode': 'http',
             'capabilities': ['test-cap'],
             'status': 'healthy'
-        }
+        }).encode()
         mock_get.return_value = mock_response
 
         locator = ServiceLocator()
@@ -145,16 +223,115 @@ class TestServiceLocator:
         assert mock_get.call_count == 1
         assert proxy1.service_info.id == proxy2.service_info.id
 
+    @patch('modularity_sdk._SESSION.get')
+    def test_get_capability_serves_stale_while_refreshing(self, mock_get):
+        """Test an expired entry is returned at once and refreshed in the background"""
+        mock_response = Mock()
+        mock_response.content = json.dumps({
+            'id': 'test-service',
+            'location': 'http://localhost:3000',
+            'mode': 'http',
+            'capabilities': ['test-cap'],
+            'status': 'healthy'
+        }).encode()
+        mock_get.return_value = mock_response
+
+        locator = ServiceLocator(ttl=0, max_stale=600)
+        proxy1 = locator.get_capability("test-cap")
+        proxy2 = locator.get_capability("test-cap")
+
+        # The stale proxy comes straight back; the refresh runs on the side
+        assert proxy2 is proxy1
+
+        # Wait for the background refresh to finish
+        locator._refresh_executor.shutdown(wait=True)
+
+        assert mock_get.call_count == 2
+        assert locator._cache["test-cap"][0] is not proxy1
+
+    @patch('modularity_sdk._SESSION.get')
+    def test_concurrent_lookups_share_one_request(self, mock_get):
+        """Test concurrent cache misses for a capability make a single registry call"""
+        release = threading.Event()
+        mock_response = Mock()
+        mock_response.content = json.dumps({
+            'id': 'test-service',
+            'location': 'http://localhost:3000',
+            'mode': 'http',
+            'capabilities': ['test-cap'],
+            'status': 'healthy'
+        }).encode()
+
+        def slow_get(*args, **kwargs):
+            release.wait(1)
+            return mock_response
+
+        mock_get.side_effect = slow_get
+
+        locator = ServiceLocator()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(locator.get_capability("test-cap")))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Let every thread reach the lookup before the registry answers
+        import time
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert mock_get.call_count == 1
+        assert len(results) == 5
+        assert all(proxy is results[0] for proxy in results)
+
+    @patch('modularity_sdk._SESSION.get')
+    def test_get_capability_non_json_response(self, mock_get):
+        """Test a non-JSON registry body surfaces as the usual RuntimeError"""
+        mock_response = Mock()
+        mock_response.content = b'<html><body>Bad Gateway</body></html>'
+        mock_get.return_value = mock_response
+
+        locator = ServiceLocator()
+        with pytest.raises(RuntimeError, match="Failed to locate capability 'test-cap'"):
+            locator.get_capability("test-cap")
+
     def test_clear_cache(self):
         """Test clearing the service cache"""
         locator = ServiceLocator()
-        locator._cache["test"] = "value"
-        locator._cache_time["test"] = 123456
+        locator._cache["test"] = ("value", 123456)
 
         locator.clear_cache()
 
         assert len(locator._cache) == 0
-        assert len(locator._cache_time) == 0
+
+    @patch('modularity_sdk._SESSION.get')
+    def test_cache_evicts_least_recently_used(self, mock_get):
+        """Test the cache keeps at most max_entries capabilities"""
+        def registry_lookup(url, **kwargs):
+            capability = url.rsplit('/', 1)[-1]
+            response = Mock()
+            response.content = json.dumps({
+                'id': f'{capability}-service',
+                'location': 'http://localhost:3000',
+                'mode': 'http',
+                'capabilities': [capability],
+                'status': 'healthy'
+            }).encode()
+            return response
+
+        mock_get.side_effect = registry_lookup
+
+        locator = ServiceLocator(max_entries=2)
+        locator.get_capability("cap-a")
+        locator.get_capability("cap-b")
+        locator.get_capability("cap-a")  # cap-b is now least recently used
+        locator.get_capability("cap-c")
+
+        assert list(locator._cache) == ["cap-a", "cap-c"]
 
 
 class TestEventBus:
@@ -169,17 +346,16 @@ class TestEventBus:
         """Test subscribing to and publishing events"""
         bus = EventBus()
         received_data = []
+        delivered = threading.Event()
 
         def handler(data):
             received_data.append(data)
+            delivered.set()
 
         bus.subscribe("test-event", handler)
         bus.publish("test-event", {"message": "hello"})
 
-        # Give the thread a moment to execute
-        import time
-        time.sleep(0.1)
-
+        assert delivered.wait(timeout=5)
         assert len(received_data) == 1
         assert received_data[0] == {"message": "hello"}
 
@@ -187,24 +363,67 @@ class TestEventBus:
         """Test multiple subscribers to the same event"""
         bus = EventBus()
         received_count = [0, 0]
+        delivered = [threading.Event(), threading.Event()]
 
         def handler1(data):
             received_count[0] += 1
+            delivered[0].set()
 
         def handler2(data):
             received_count[1] += 1
+            delivered[1].set()
 
         bus.subscribe("test-event", handler1)
         bus.subscribe("test-event", handler2)
         bus.publish("test-event", {})
 
-        # Give threads a moment to execute
-        import time
-        time.sleep(0.1)
-
+        assert all(event.wait(timeout=5) for event in delivered)
         assert received_count[0] == 1
         assert received_count[1] == 1
 
+    def test_duplicate_subscribe_and_unsubscribe(self):
+        """Test a handler subscribed twice runs once, and extra unsubscribes are ignored"""
+        bus = EventBus()
+        received_data = []
+
+        def handler(data):
+            received_data.append(data)
+
+        bus.subscribe("test-event", handler)
+        bus.subscribe("test-event", handler)
+        bus.publish("test-event", {"message": "hello"})
+
+        # Drain the pool so a second (duplicate) call would have run by now
+        bus._executor.shutdown(wait=True)
+
+        assert received_data == [{"message": "hello"}]
+
+        bus.unsubscribe("test-event", handler)
+        bus.unsubscribe("test-event", handler)
+        bus.unsubscribe("other-event", handler)
+        assert "test-event" not in bus._subscribers
+
+    def test_failing_handler_does_not_block_others(self):
+        """Test a handler that raises doesn't stop delivery to the rest"""
+        bus = EventBus()
+        received_data = []
+        delivered = threading.Event()
+
+        def failing_handler(data):
+            raise RuntimeError("boom")
+
+        def handler(data):
+            received_data.append(data)
+            delivered.set()
+
+        bus.subscribe("test-event", failing_handler)
+        bus.subscribe("test-event", handler)
+        bus.publish("test-event", {"message": "hello"})
+
+        assert delivered.wait(timeout=5)
+
+        assert received_data == [{"message": "hello"}]
+
     def test_unsubscribe(self):
         """Test unsubscribing from events"""
         bus = EventBus()
@@ -217,9 +436,8 @@ class TestEventBus:
         bus.unsubscribe("test-event", handler)
         bus.publish("test-event", {"message": "hello"})
 
-        # Give the thread a moment to execute
-        import time
-        time.sleep(0.1)
+        # Drain the pool so anything wrongly submitted has run
+        bus._executor.shutdown(wait=True)
 
         assert len(received_data) == 0
 
@@ -272,7 +490,7 @@ class TestModularitySDK:
                 sdk = ModularitySDK(str(manifest_path))
                 assert sdk.config.get('port') == '8080'
 
-    @patch('modularity_sdk.requests.get')
+    @patch('modularity_sdk._SESSION.get')
     def test_invoke_capability(self, mock_get):
         """Test invoking a remote capability"""
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -291,26 +509,200 @@ class TestModularitySDK:
 
             # Mock the registry response
             mock_response = Mock()
-            mock_response.json.return_value = {
+            mock_response.content = json.dumps({
                 'id': 'remote-service',
                 'location': 'http://localhost:3000',
                 'mode': 'http',
                 'capabilities': ['remote-cap'],
                 'status': 'healthy'
-            }
+            }).encode()
             mock_get.return_value = mock_response
 
             sdk = ModularitySDK(str(manifest_path))
 
             # Mock the actual capability invocation
-            with patch('modularity_sdk.requests.post') as mock_post:
+            with patch('modularity_sdk._SESSION.post') as mock_post:
                 mock_post_response = Mock()
-                mock_post_response.json.return_value = {"result": "success"}
+                mock_post_response.content = json.dumps({"result": "success"}).encode()
                 mock_post.return_value = mock_post_response
 
                 result = sdk.invoke_capability("remote-cap", {"param": "value"})
                 assert result == {"result": "success"}
 
+    @patch('modularity_sdk._SESSION.post')
+    @patch('modularity_sdk._SESSION.get')
+    def test_invoke_capabilities(self, mock_get, mock_post):
+        """Test invoking several capabilities at once returns results in call order"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = Path(tmpdir) / "app.manifest.json"
+            manifest_data = {
+                "id": "test-app",
+                "name": "Test App",
+                "version": "1.0.0",
+                "type": "module",
+                "runtime": "python",
+                "provides": {"capabilities": []},
+                "interfaces": {}
+            }
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest_data, f)
+
+            def registry_lookup(url, **kwargs):
+                capability = url.rsplit('/', 1)[-1]
+                response = Mock()
+                response.content = json.dumps({
+                    'id': f'{capability}-service',
+                    'location': f'http://localhost:3000/{capability}',
+                    'mode': 'http',
+                    'capabilities': [capability],
+                    'status': 'healthy'
+                }).encode()
+                return response
+
+            def invoke(url, data, **kwargs):
+                response = Mock()
+                response.content = json.dumps({"echo": json.loads(data)['params']}).encode()
+                return response
+
+            mock_get.side_effect = registry_lookup
+            mock_post.side_effect = invoke
+
+            sdk = ModularitySDK(str(manifest_path))
+            results = sdk.invoke_capabilities([("cap-a", {"n": 1}), ("cap-b", {"n": 2})])
+
+            assert results == [{"echo": {"n": 1}}, {"echo": {"n": 2}}]
+
+    def test_close_shuts_down_thread_pools(self):
+        """Test leaving a with block shuts down every pool the SDK owns"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = Path(tmpdir) / "app.manifest.json"
+            with open(manifest_path, 'w') as f:
+                json.dump({"id": "test-app", "name": "Test App", "interfaces": {}}, f)
+
+            with ModularitySDK(str(manifest_path)) as sdk:
+                pass
+
+            for executor in (sdk._invoke_executor, sdk.locator._refresh_executor,
+                             sdk.event_bus._executor):
+                with pytest.raises(RuntimeError):
+                    executor.submit(print)
+
+    def test_module_class_is_loaded_once(self):
+        """Test loading a module twice reuses the class until the cache is cleared"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = Path(tmpdir) / "app.manifest.json"
+            manifest_data = {
+                "id": "test-app",
+                "name": "Test App",
+                "version": "1.0.0",
+                "type": "module",
+                "runtime": "python",
+                "provides": {"capabilities": []},
+                "interfaces": {
+                    "module": {"entry": "module.py", "class": "TestModule"}
+                }
+            }
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest_data, f)
+            (Path(tmpdir) / "module.py").write_text(
+                "from modularity_sdk import ModuleInterface\n"
+                "class TestModule(ModuleInterface):\n"
+                "    def initialize(self, config): return True\n"
+                "    def get_capabilities(self): return []\n"
+                "    def invoke(self, capability, params): return {}\n"
+                "    def handle_event(self, event, data): pass\n"
+                "    def shutdown(self): pass\n"
+            )
+
+            sdk = ModularitySDK(str(manifest_path))
+            first = sdk.load_as_module()
+            second = sdk.load_as_module()
+
+            assert first is not second
+            assert type(first) is type(second)
+
+            clear_module_cache()
+            assert type(sdk.load_as_module()) is not type(first)
+
+    @patch('modularity_sdk._SESSION.post')
+    def test_register_with_registry(self, mock_post):
+        """Test registration posts the manifest-derived payload, built once"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = Path(tmpdir) / "app.manifest.json"
+            manifest_data = {
+                "id": "test-app",
+                "name": "Test App",
+                "version": "1.0.0",
+                "type": "module",
+                "runtime": "python",
+                "provides": {"capabilities": ["cap1"]},
+                "interfaces": {"http": {"port": 3100}}
+            }
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest_data, f)
+
+            sdk = ModularitySDK(str(manifest_path), "http://localhost:5000")
+            sdk._register_with_registry()
+            sdk._register_with_registry()
+
+            first, second = mock_post.call_args_list
+            assert first.args == ("http://localhost:5000/api/register",)
+            assert json.loads(first.kwargs['data']) == {
+                'id': 'test-app',
+                'name': 'Test App',
+                'version': '1.0.0',
+                'capabilities': ['cap1'],
+                'location': 'http://localhost:3100',
+                'mode': 'http'
+            }
+            assert second.kwargs['data'] is first.kwargs['data']
+
+    def test_standalone_gzips_large_responses(self):
+        """Test the standalone server compresses big JSON replies for clients that accept gzip"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = Path(tmpdir) / "app.manifest.json"
+            manifest_data = {
+                "id": "test-app",
+                "name": "Test App",
+                "version": "1.0.0",
+                "type": "module",
+                "runtime": "python",
+                "provides": {"capabilities": ["big"]},
+                "interfaces": {
+                    "http": {"port": 3100},
+                    "module": {"entry": "module.py", "class": "TestModule"}
+                }
+            }
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest_data, f)
+            (Path(tmpdir) / "module.py").write_text(
+                "from modularity_sdk import ModuleInterface\n"
+                "class TestModule(ModuleInterface):\n"
+                "    def initialize(self, config): return True\n"
+                "    def get_capabilities(self): return ['big']\n"
+                "    def invoke(self, capability, params): return {'data': 'x' * 5000}\n"
+                "    def handle_event(self, event, data): pass\n"
+                "    def shutdown(self): pass\n"
+            )
+
+            sdk = ModularitySDK(str(manifest_path))
+            with patch('flask.Flask.run', autospec=True) as mock_run, \
+                    patch.object(ModularitySDK, '_register_with_registry'):
+                sdk.run_standalone()
+            client = mock_run.call_args.args[0].test_client()
+
+            body = json.dumps({'capability': 'big', 'params': {}})
+            response = client.post('/_module/invoke', data=body, content_type='application/json',
+                                   headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert json.loads(gzip.decompress(response.data)) == {'data': 'x' * 5000}
+
+            response = client.post('/_module/invoke', data=body, content_type='application/json')
+            assert 'Content-Encoding' not in response.headers
+
+            response = client.get('/_module/health', headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in response.headers
+
     def test_event_publishing(self):
         """Test publishing events"""
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -329,17 +721,16 @@ class TestModularitySDK:
 
             sdk = ModularitySDK(str(manifest_path))
             received_data = []
+            delivered = threading.Event()
 
             def handler(data):
                 received_data.append(data)
+                delivered.set()
 
             sdk.subscribe_event("test-event", handler)
             sdk.publish_event("test-event", {"message": "hello"})
 
-            # Give the thread a moment to execute
-            import time
-            time.sleep(0.1)
-
+            assert delivered.wait(timeout=5)
             assert len(received_data) == 1
             assert received_data[0] == {"message": "hello"}
 